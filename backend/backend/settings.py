@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
+from .database import database_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -79,13 +81,18 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 
+# SQLite by default; set DATABASE_URL=postgres://... for PostgreSQL
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR)
 }
 
+# Serialize writes through one writer thread per process (SQLite only).
+# Off under `manage.py test`: the test database is shared in-memory SQLite,
+# which the writer thread's connection would find locked.
+TESTING = sys.argv[1:2] == ['test']
+DATABASE_WRITE_QUEUE = os.environ.get('DATABASE_WRITE_QUEUE', 'false' if TESTING else 'true').lower() != 'false'
+SQLITE_BUSY_TIMEOUT_MS = 20000
+
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -118,6 +125,20 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Ollama settings
 OLLAMA_BASE_URL = 'http://localhost:11434'
 OLLAMA_MODEL = 'llama2'  # Change to your preferred model
+# How long Ollama keeps the model loaded after a request ("30m", "1h", or -1 for forever)
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+# Load the model in the background when the web server starts
+OLLAMA_WARMUP = os.environ.get('OLLAMA_WARMUP', 'true').lower() != 'false'
+# Seconds the startup warm-up waits for Ollama to load the model
+OLLAMA_WARMUP_TIMEOUT = 300
+
+# Health snapshot behind /api/health/ready/ (see docs_assistant/health.py)
+HEALTH_REFRESH_SECONDS = 10
+HEALTH_SNAPSHOT_TTL = 60
+HEALTH_CHECK_TIMEOUT = 3
+# Ollama is reported but left out: every replica shares it, so failing
+# readiness on it would take them all out of rotation at once.
+HEALTH_READINESS_CHECKS = ['embedding_model', 'database', 'vector_store']
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -151,7 +172,39 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Web page extraction: 'lxml' (fast, keeps section headings) or 'bs4'
+HTML_EXTRACTOR = os.environ.get('HTML_EXTRACTOR', 'lxml')
+HTML_MAX_BYTES = int(os.environ.get('HTML_MAX_BYTES', 5 * 1024 * 1024))
+
 CHROMA_PERSIST_DIRECTORY="/chroma"
+
+# Vector store backend: 'chroma' or 'mmap' (memory-mapped index next to the DB)
+VECTOR_STORE_BACKEND = os.environ.get('VECTOR_STORE_BACKEND', 'chroma')
+VECTOR_STORE_DIRECTORY = os.path.join(BASE_DIR, 'vector_store')
+
+# Chat memory: rolling session summary plus the most recent messages,
+# bounded by an approximate token budget
+CHAT_MEMORY_TOKEN_BUDGET = 1024
+CHAT_HISTORY_MESSAGES = 6
+CHAT_SUMMARY_BATCH_MESSAGES = 4
+CHAT_SUMMARY_MAX_TOKENS = 256
+CHAT_QUERY_REWRITE = True
+
+# Documents with more chunks than this are purged in the background
+DOCUMENT_DELETE_SYNC_MAX_CHUNKS = 2000
+DOCUMENT_DELETE_BATCH_SIZE = 1000
+
+# Two-level retrieval: pick the closest documents by centroid, then search
+# only their chunks
+DOCUMENT_ROUTING = os.environ.get('DOCUMENT_ROUTING', 'false').lower() == 'true'
+DOCUMENT_ROUTING_TOP_DOCUMENTS = 20
+
+# Optional compressed embedding index ('pca' or 'pq'; empty disables it).
+# Build it from the vector store with `python manage.py build_compressed_index`.
+EMBEDDING_COMPRESSION = os.environ.get('EMBEDDING_COMPRESSION', '')
+EMBEDDING_COMPRESSION_DIRECTORY = os.path.join(BASE_DIR, 'compressed_index')
+EMBEDDING_RERANK_CANDIDATES = 50
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
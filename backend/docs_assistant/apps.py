@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DocsAssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'docs_assistant'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite, dispatch_uid='docs_assistant.configure_sqlite')
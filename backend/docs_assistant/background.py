@@ -0,0 +1,79 @@
+# docs_assistant/background.py
+"""In-process background work queue; tasks are lost on restart, so submit only resumable work."""
+import logging
+import os
+import queue
+import threading
+from typing import Callable
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    def __init__(self, workers: int = 1, name: str = 'documind-background'):
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._running = 0
+        self._lock = threading.Lock()
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        self._tasks.put((fn, args, kwargs))
+
+    @property
+    def depth(self) -> int:
+        """Tasks waiting or running"""
+        with self._lock:
+            return self._tasks.qsize() + self._running
+
+    def join(self):
+        """Block until every submitted task has finished"""
+        self._tasks.join()
+
+    def _work(self):
+        while True:
+            fn, args, kwargs = self._tasks.get()
+            with self._lock:
+                self._running += 1
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logger.exception("Background task %s failed", getattr(fn, '__name__', fn))
+            finally:
+                # Worker threads hold their own DB connections; drop them
+                # between tasks the way a request cycle would.
+                close_old_connections()
+                with self._lock:
+                    self._running -= 1
+                self._tasks.task_done()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_background_queue() -> BackgroundQueue:
+    """Process-wide background queue, started on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BackgroundQueue()
+        return _queue
+
+
+def _reset_after_fork():
+    # A forked child (e.g. a gunicorn --preload worker) inherits the queue but
+    # not its threads; start over so the next get_background_queue() makes a
+    # working one. Tasks queued before the fork stay with the parent.
+    global _queue, _queue_lock
+    _queue = None
+    _queue_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,7 @@
+# docs_assistant/bench/__init__.py
+"""Reproducible benchmark harness, run with `python manage.py benchmark`."""
+from .corpus import CorpusGenerator
+from .fakes import FakeEmbedder, FakeOllamaServer
+from .suites import SUITES, run_benchmarks
+
+__all__ = ['CorpusGenerator', 'FakeEmbedder', 'FakeOllamaServer', 'SUITES', 'run_benchmarks']
@@ -0,0 +1,212 @@
+# docs_assistant/bench/corpus.py
+"""Synthetic, seed-deterministic documentation corpora for benchmarking."""
+import os
+import random
+from typing import Dict, List
+
+VOCABULARY = (
+    "api client server request response handler middleware router endpoint "
+    "query index vector embedding chunk document session token cache buffer "
+    "stream socket thread worker queue scheduler retry timeout backoff config "
+    "setting option parameter argument return value exception error logging "
+    "metric trace span database table column migration model serializer view "
+    "template render component state hook effect promise future callback "
+    "event signal listener plugin extension module package import export "
+    "function method class instance attribute property decorator generator "
+    "iterator context manager lock mutex semaphore pool connection transaction "
+    "commit rollback schema field validator parser lexer compiler runtime "
+    "memory allocation garbage collector profiler benchmark latency throughput "
+    "deployment container cluster node replica shard partition consensus "
+    "authentication authorization permission credential secret key certificate"
+).split()
+
+KINDS = ('text', 'markdown', 'pdf', 'code')
+EXTENSIONS = {'text': '.txt', 'markdown': '.md', 'pdf': '.pdf', 'code': '.py', 'html': '.html'}
+
+
+class CorpusGenerator:
+    """Writes synthetic documents of a given kind and approximate size."""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def _sentence(self, rng: random.Random, topic: List[str]) -> str:
+        words = [rng.choice(topic) if rng.random() < 0.4 else rng.choice(VOCABULARY)
+                 for _ in range(rng.randint(8, 18))]
+        return " ".join(words).capitalize() + "."
+
+    def _paragraphs(self, rng: random.Random, topic: List[str], size: int) -> List[str]:
+        paragraphs = []
+        total = 0
+        while total < size:
+            paragraph = " ".join(self._sentence(rng, topic) for _ in range(rng.randint(3, 7)))
+            paragraphs.append(paragraph)
+            total += len(paragraph) + 2
+        return paragraphs
+
+    def render(self, kind: str, index: int, size: int) -> Dict:
+        """Return the document body and the topic words it was built around"""
+        rng = random.Random(f"{self.seed}:{kind}:{index}")
+        topic = rng.sample(VOCABULARY, 6)
+        paragraphs = self._paragraphs(rng, topic, size)
+        title = f"{topic[0].capitalize()} {topic[1]} guide {index}"
+
+        if kind == 'markdown':
+            parts = [f"# {title}"]
+            for i, paragraph in enumerate(paragraphs):
+                if i % 3 == 0:
+                    parts.append(f"## {rng.choice(topic).capitalize()} {rng.choice(VOCABULARY)}")
+                parts.append(paragraph)
+                if i % 4 == 1:
+                    parts.append(f"```python\n{topic[2]}_{topic[3]}(value)\n```")
+            body = "\n\n".join(parts)
+        elif kind == 'code':
+            parts = [f'"""{title}."""', "import os", ""]
+            for i, paragraph in enumerate(paragraphs):
+                name = f"{rng.choice(topic)}_{rng.choice(VOCABULARY)}_{i}"
+                parts.append(
+                    f"def {name}(value, option=None):\n"
+                    f"    \"\"\"{paragraph}\"\"\"\n"
+                    f"    if option is None:\n"
+                    f"        option = os.environ.get('{topic[0].upper()}', '{topic[1]}')\n"
+                    f"    return value, option\n"
+                )
+            body = "\n\n".join(parts)
+        elif kind == 'html':
+            body = self._html_page(rng, topic, title, paragraphs)
+        else:
+            body = "\n\n".join([title] + paragraphs)
+
+        return {'title': title, 'topic': topic, 'body': body}
+
+    def _html_page(self, rng: random.Random, topic: List[str], title: str, paragraphs: List[str]) -> str:
+        """A documentation-site page: theme assets, header, sidebar and footer around the article"""
+        links = "".join(
+            f'<li class="toctree-l1"><a class="reference internal" href="/{word}/">{word.capitalize()}</a></li>'
+            for word in rng.sample(VOCABULARY, 40)
+        )
+        parts = [f'<h1>{title}<a class="headerlink" href="#top">¶</a></h1>']
+        for i, paragraph in enumerate(paragraphs):
+            if i % 4 == 0:
+                heading = f"{rng.choice(topic).capitalize()} {rng.choice(VOCABULARY)}"
+                parts.append(f'<section id="s{i}"><h{2 + (i // 4) % 2}>{heading}</h{2 + (i // 4) % 2}>')
+            words = paragraph.split(" ")
+            words[1] = f'<code class="docutils literal"><span class="pre">{words[1]}</span></code>'
+            words[3] = f'<a class="reference external" href="https://example.com/{words[3]}">{words[3]}</a>'
+            parts.append(f"<p>{' '.join(words)}</p>")
+            if i % 5 == 2:
+                parts.append(
+                    '<div class="highlight-python"><div class="highlight"><pre><span></span>'
+                    f'<span class="n">{topic[2]}</span><span class="o">.</span>'
+                    f'<span class="n">{topic[3]}</span><span class="p">(</span>'
+                    '<span class="n">value</span><span class="p">)</span>\n'
+                    '<span class="k">return</span> <span class="kc">None</span>\n</pre></div></div>'
+                )
+            if i % 7 == 6:
+                rows = "".join(f"<tr><td><code>{word}</code></td><td>{self._sentence(rng, topic)}</td></tr>"
+                               for word in rng.sample(topic, 3))
+                parts.append(f'<table class="docutils"><thead><tr><th>Option</th><th>Description</th></tr></thead>'
+                             f'<tbody>{rows}</tbody></table>')
+            if i % 4 == 3:
+                parts.append('</section>')
+        return (
+            '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+            f'<title>{title} &mdash; Docs</title>'
+            '<link rel="stylesheet" href="/_static/theme.css">'
+            '<style>' + 'body{margin:0;font-family:sans-serif}.wy-nav-side{width:300px}' * 20 + '</style>'
+            '<script>' + 'window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}' * 20
+            + '</script></head><body class="wy-body-for-nav">'
+            '<header class="site-header"><a href="/">Project docs</a><form role="search">'
+            '<input type="text" name="q" placeholder="Search docs"></form></header>'
+            f'<div class="wy-grid-for-nav"><nav class="wy-nav-side"><ul>{links}</ul></nav>'
+            '<div class="wy-nav-content"><div role="main" class="document">'
+            f'<article itemprop="articleBody">{"".join(parts)}</article></div>'
+            '<footer><p>&copy; Copyright. Built with a documentation generator.</p></footer>'
+            '</div></div><script src="/_static/search.js"></script></body></html>'
+        )
+
+    def write(self, directory: str, kind: str, index: int, size: int) -> Dict:
+        document = self.render(kind, index, size)
+        path = os.path.join(directory, f"{kind}_{index:05d}{EXTENSIONS[kind]}")
+        if kind == 'pdf':
+            write_pdf(path, document['body'])
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(document['body'])
+        return {'path': path, 'kind': kind, 'title': document['title'], 'topic': document['topic']}
+
+    def generate(self, directory: str, documents: int, size: int, kinds=KINDS) -> List[Dict]:
+        """Write `documents` files round-robin over `kinds` and return their manifest"""
+        os.makedirs(directory, exist_ok=True)
+        return [self.write(directory, kinds[i % len(kinds)], i, size) for i in range(documents)]
+
+    def queries(self, manifest: List[Dict], count: int) -> List[Dict]:
+        """Build queries from each document's topic words, keeping the expected source"""
+        rng = random.Random(f"{self.seed}:queries")
+        queries = []
+        for i in range(count):
+            entry = manifest[i % len(manifest)]
+            words = rng.sample(entry['topic'], 4)
+            queries.append({'query': f"How do I use {' '.join(words)}?", 'expected': entry['path']})
+        return queries
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for word in paragraph.split():
+            if current and len(current) + len(word) + 1 > width:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        lines.append(current)
+    return lines
+
+
+def write_pdf(path: str, text: str, lines_per_page: int = 60):
+    """Write a minimal text-only PDF that PyPDF2 can extract"""
+    lines = _wrap(text)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Object layout: 1 catalog, 2 page tree, 3 font, then (page, content) pairs.
+    objects = {}
+    page_ids = []
+    for n, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * n, 5 + 2 * n
+        page_ids.append(page_id)
+        stream = "BT /F1 10 Tf 12 TL 50 790 Td\n" + "".join(
+            f"({_pdf_escape(line)}) Tj T*\n" for line in page_lines
+        ) + "ET"
+        data = stream.encode('latin-1', 'replace')
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+
+    xref = len(output)
+    size = max(objects) + 1
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for object_id in range(1, size):
+        output += b"%010d 00000 n \n" % offsets[object_id]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+
+    with open(path, 'wb') as file:
+        file.write(bytes(output))
@@ -0,0 +1,233 @@
+# docs_assistant/bench/fakes.py
+"""Deterministic stand-ins for the embedding model and the Ollama server."""
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+class FakeEmbedder:
+    """Hashing bag-of-words embedder with the SentenceTransformer encode() API.
+
+    Vectors are a pure function of the input text, so benchmark runs are
+    reproducible, and texts sharing vocabulary end up close to each other,
+    which keeps retrieval results meaningful.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self._token_cache: Dict[str, tuple] = {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _token_slot(self, token: str) -> tuple:
+        slot = self._token_cache.get(token)
+        if slot is None:
+            digest = zlib.crc32(token.encode('utf-8'))
+            slot = (digest % self.dimension, 1.0 if (digest >> 16) & 1 else -1.0)
+            self._token_cache[token] = slot
+        return slot
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        vectors = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        for row, text in enumerate(sentences):
+            for token in TOKEN_RE.findall(text.lower()):
+                index, sign = self._token_slot(token)
+                vectors[row, index] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors[0] if single else vectors
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeOllama/0.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({'models': [{'name': self.server.model, 'size': 0}]})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_POST(self):
+        payload = self._read_json()
+        fake = self.server.fake
+        fake.received.append((self.path, payload))
+
+        if self.path == '/api/generate':
+            prompt = "\n".join(part for part in (payload.get('system'), payload.get('prompt')) if part)
+            stats = fake.simulate(prompt, payload.get('keep_alive'))
+            self._send_json({
+                'model': payload.get('model', fake.model),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'response': fake.answer_for(prompt) if prompt else '',
+                'done': True,
+                **stats,
+            })
+        elif self.path == '/api/chat':
+            messages = payload.get('messages', [])
+            prompt = "\n".join(message.get('content', '') for message in messages)
+            stats = fake.simulate(prompt, payload.get('keep_alive'))
+            self._send_json({
+                'model': payload.get('model', fake.model),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'message': {'role': 'assistant', 'content': fake.answer_for(prompt) if prompt else ''},
+                'done': True,
+                **stats,
+            })
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+
+def keep_alive_seconds(keep_alive, default: float = 300.0) -> float:
+    """Ollama keep_alive ("5m", "30s", 3600, -1 ...) in seconds; negative means forever"""
+    if keep_alive is None or keep_alive == '':
+        return default
+    if isinstance(keep_alive, str):
+        units = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        match = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", keep_alive.strip())
+        if not match:
+            return default
+        seconds = float(match.group(1)) * units[match.group(2) or 's']
+    else:
+        seconds = float(keep_alive)
+    return float('inf') if seconds < 0 else seconds
+
+
+class FakeOllamaServer:
+    """Local HTTP server emulating the subset of the Ollama API the app uses.
+
+    Latency is simulated per request as a fixed overhead plus a per-token
+    prompt evaluation cost, and the response carries the same timing fields
+    (in nanoseconds) as a real Ollama server. Like Ollama it also models:
+
+    * loading: the first request, and the first after `keep_alive` expired,
+      waits `load_time` and reports it as `load_duration`; an empty prompt
+      only loads the model (the documented way to preload it);
+    * prefix caching: the tokens a prompt shares with the previous one are
+      not evaluated again, so `prompt_eval_count` only counts the new tail.
+
+    Usage::
+
+        with FakeOllamaServer() as server:
+            client = ollama.Client(host=server.url)
+    """
+
+    def __init__(self, model: str = 'llama2', latency: float = 0.0,
+                 prompt_eval_per_token: float = 0.0, eval_tokens: int = 32,
+                 load_time: float = 0.0):
+        self.model = model
+        self.latency = latency
+        self.prompt_eval_per_token = prompt_eval_per_token
+        self.eval_tokens = eval_tokens
+        self.load_time = load_time
+        self.requests = 0
+        self.loads = 0
+        # (path, JSON body) of every POST, for tests to inspect.
+        self.received: List[Tuple[str, Dict]] = []
+        self._lock = threading.Lock()
+        self._loaded_until = 0.0
+        self._ready_at = 0.0
+        self._cached_tokens: List[str] = []
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def answer_for(self, prompt: str) -> str:
+        digest = zlib.crc32(prompt.encode('utf-8'))
+        return f"Synthetic answer {digest:08x} based on the provided documentation context."
+
+    def simulate(self, prompt: str, keep_alive=None) -> Dict:
+        tokens = prompt.split()
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now >= self._loaded_until:
+                self.loads += 1
+                self._ready_at = now + self.load_time
+                self._cached_tokens = []
+            load = max(self._ready_at - now, 0.0)
+
+            cached = 0
+            for cached_token, token in zip(self._cached_tokens, tokens):
+                if cached_token != token:
+                    break
+                cached += 1
+            if tokens:
+                self._cached_tokens = tokens
+            self._loaded_until = max(now, self._ready_at) + keep_alive_seconds(keep_alive)
+
+        evaluated = len(tokens) - cached
+        prompt_eval = evaluated * self.prompt_eval_per_token
+        generation = max(self.latency, 0.0) if tokens else 0.0
+        delay = load + prompt_eval + generation
+        if delay > 0:
+            time.sleep(delay)
+
+        return {
+            'total_duration': int(delay * 1e9),
+            'load_duration': int(load * 1e9),
+            'prompt_eval_count': evaluated,
+            'prompt_eval_duration': int(prompt_eval * 1e9),
+            'eval_count': self.eval_tokens if tokens else 0,
+            'eval_duration': int(generation * 1e9),
+        }
+
+    def start(self) -> 'FakeOllamaServer':
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _FakeOllamaHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._httpd.model = self.model
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> 'FakeOllamaServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,856 @@
+# docs_assistant/bench/suites.py
+"""Benchmark suites for the ingestion, retrieval and chat hot paths."""
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .corpus import KINDS, CorpusGenerator
+from .fakes import FakeEmbedder, FakeOllamaServer
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """Summarize latency samples (seconds) in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of the process resident set size"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class BenchContext:
+    """Shared state for one benchmark run: corpus, fakes and services"""
+
+    def __init__(self, options: Dict):
+        self.options = options
+        self._tempdir = tempfile.TemporaryDirectory(prefix='documind-bench-')
+        self.workdir = self._tempdir.name
+        self.generator = CorpusGenerator(seed=options['seed'])
+        self.embedder = FakeEmbedder()
+        self.ollama_server = FakeOllamaServer(
+            model=options['model'],
+            latency=options['ollama_latency'],
+            prompt_eval_per_token=options['prompt_eval_per_token'],
+        )
+        self._manifest = None
+        self._queries = None
+        self._vector_store = None
+        self._document_index = None
+        self.ingested = False
+
+    @property
+    def manifest(self) -> List[Dict]:
+        if self._manifest is None:
+            directory = self.options.get('corpus_dir') or f"{self.workdir}/corpus"
+            self._manifest = self.generator.generate(
+                directory, self.options['documents'], self.options['document_size'],
+                kinds=self.options['kinds'],
+            )
+        return self._manifest
+
+    @property
+    def queries(self) -> List[Dict]:
+        if self._queries is None:
+            self._queries = self.generator.queries(self.manifest, self.options['queries'])
+        return self._queries
+
+    def open_vector_store(self, backend: str, name: str):
+        from ..vector_store import ChromaVectorStore, MmapVectorStore
+        if backend == 'chroma':
+            return ChromaVectorStore(path=f"{self.workdir}/{name}")
+        return MmapVectorStore(directory=f"{self.workdir}/{name}")
+
+    @property
+    def vector_store(self):
+        if self._vector_store is None:
+            backend = self.options['vector_store']
+            self._vector_store = self.open_vector_store(backend, backend)
+        return self._vector_store
+
+    @property
+    def document_index(self):
+        if self._document_index is None:
+            backend = self.options['vector_store']
+            self._document_index = self.open_vector_store(backend, f"{backend}-documents")
+        return self._document_index
+
+    def processor(self):
+        from ..services import DocumentProcessor
+        return DocumentProcessor(embedding_model=self.embedder, vector_store=self.vector_store,
+                                 document_index=self.document_index)
+
+    def rag_service(self):
+        import ollama
+        from ..services import RAGService
+        return RAGService(
+            embedding_model=self.embedder,
+            vector_store=self.vector_store,
+            ollama_client=ollama.Client(host=self.ollama_server.url),
+        )
+
+    def ensure_ingested(self):
+        if not self.ingested:
+            bench_ingest(self)
+
+    def close(self):
+        self.ollama_server.stop()
+        self._tempdir.cleanup()
+
+
+def bench_ingest(ctx: BenchContext) -> Dict:
+    """Extract, chunk, embed and store every corpus document"""
+    manifest = ctx.manifest
+    processor = ctx.processor()
+    extract_time = chunk_time = store_time = 0.0
+    chunk_count = 0
+    per_kind = {}
+
+    started = time.perf_counter()
+    for entry in manifest:
+        t0 = time.perf_counter()
+        text = processor.process_file(entry['path'])
+        t1 = time.perf_counter()
+        chunks = processor.chunk_text(text)
+        t2 = time.perf_counter()
+        processor.store_chunks(entry['path'], chunks, {'title': entry['title'], 'source_type': 'file'})
+        t3 = time.perf_counter()
+
+        extract_time += t1 - t0
+        chunk_time += t2 - t1
+        store_time += t3 - t2
+        chunk_count += len(chunks)
+        kind = per_kind.setdefault(entry['kind'], {'documents': 0, 'extract_seconds': 0.0})
+        kind['documents'] += 1
+        kind['extract_seconds'] += t1 - t0
+    elapsed = time.perf_counter() - started
+    ctx.ingested = True
+
+    return {
+        'documents': len(manifest),
+        'chunks': chunk_count,
+        'seconds': elapsed,
+        'docs_per_sec': len(manifest) / elapsed if elapsed else 0.0,
+        'chunks_per_sec': chunk_count / elapsed if elapsed else 0.0,
+        'extract_seconds': extract_time,
+        'chunk_seconds': chunk_time,
+        'embed_store_seconds': store_time,
+        'per_kind': per_kind,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_retrieval(ctx: BenchContext) -> Dict:
+    """Latency of single-query nearest-neighbour retrieval"""
+    ctx.ensure_ingested()
+    rag = ctx.rag_service()
+    top_k = ctx.options['top_k']
+    latencies = []
+    hits = 0
+
+    for entry in ctx.queries:
+        t0 = time.perf_counter()
+        chunks = rag.retrieve_relevant_chunks(entry['query'], top_k=top_k)
+        latencies.append(time.perf_counter() - t0)
+        if any(chunk['metadata'].get('document_id') == entry['expected'] for chunk in chunks):
+            hits += 1
+
+    return {
+        'top_k': top_k,
+        'latency': percentiles(latencies),
+        'source_hit_rate': hits / len(ctx.queries) if ctx.queries else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_chat(ctx: BenchContext) -> Dict:
+    """End-to-end chat latency under concurrent load against the fake Ollama server"""
+    ctx.ensure_ingested()
+    rag = ctx.rag_service()
+    queries = [entry['query'] for entry in ctx.queries][:ctx.options['chat_requests']]
+    concurrency = ctx.options['concurrency']
+
+    def timed_chat(query):
+        t0 = time.perf_counter()
+        rag.chat(query)
+        return time.perf_counter() - t0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed_chat, queries))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(queries),
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_sec': len(queries) / elapsed if elapsed else 0.0,
+        'latency': percentiles(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _corpus_embeddings(ctx: BenchContext):
+    ctx.ensure_ingested()
+    return ctx.vector_store.all_embeddings()
+
+
+def _recall(found: List[str], expected: List[str]) -> float:
+    return len(set(found) & set(expected)) / len(expected) if expected else 1.0
+
+
+def bench_compression(ctx: BenchContext) -> Dict:
+    """Memory per chunk, latency and recall@k of compressed indexes vs float32"""
+    from ..compression import CompressedIndex
+
+    ids, vectors = _corpus_embeddings(ctx)
+    top_k = ctx.options['top_k']
+    candidates = ctx.options['rerank_candidates']
+    queries = ctx.embedder.encode([entry['query'] for entry in ctx.queries])
+
+    normalized = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    ground_truth, exact_latencies = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        scores = normalized @ (query / max(np.linalg.norm(query), 1e-12))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        exact_latencies.append(time.perf_counter() - t0)
+        ground_truth.append([ids[row] for row in best])
+
+    variants = {
+        'float32_exact': {
+            'bytes_per_chunk': vectors.shape[1] * 4,
+            'latency': percentiles(exact_latencies),
+            'recall_at_k': 1.0,
+        },
+    }
+
+    store_latencies, store_recall = [], []
+    for query, expected in zip(queries, ground_truth):
+        t0 = time.perf_counter()
+        found = ctx.vector_store.query(query, top_k=top_k)
+        store_latencies.append(time.perf_counter() - t0)
+        store_recall.append(_recall([chunk['id'] for chunk in found], expected))
+    variants[ctx.options['vector_store']] = {
+        'bytes_per_chunk': vectors.shape[1] * 4,
+        'latency': percentiles(store_latencies),
+        'recall_at_k': statistics.fmean(store_recall),
+    }
+
+    configurations = {
+        'pca64': ('pca', {'components': 64}),
+        'pca128': ('pca', {'components': 128}),
+        'pq48': ('pq', {'subspaces': 48}),
+        'pq96': ('pq', {'subspaces': 96}),
+    }
+    for name, (method, params) in configurations.items():
+        t0 = time.perf_counter()
+        index = CompressedIndex.build(method, ids, vectors, directory=f"{ctx.workdir}/{name}", **params)
+        build_seconds = time.perf_counter() - t0
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, ground_truth):
+            t0 = time.perf_counter()
+            hits = index.search(query, top_k=top_k, candidates=candidates)
+            latencies.append(time.perf_counter() - t0)
+            recalls.append(_recall([chunk_id for chunk_id, _ in hits], expected))
+
+        variants[name] = {
+            'bytes_per_chunk': index.memory_bytes / len(index),
+            'build_seconds': build_seconds,
+            'latency': percentiles(latencies),
+            'recall_at_k': statistics.fmean(recalls),
+        }
+
+    return {
+        'chunks': len(ids),
+        'top_k': top_k,
+        'rerank_candidates': candidates,
+        'variants': variants,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def bench_vector_store(ctx: BenchContext) -> Dict:
+    """Compare the vector store backends on the same chunks and embeddings"""
+    from ..vector_store import VECTOR_STORE_BACKENDS
+
+    processor = ctx.processor()
+    records = []
+    for entry in ctx.manifest:
+        for i, chunk in enumerate(processor.chunk_text(processor.process_file(entry['path']))):
+            records.append((f"{entry['path']}_{i}", chunk, {'document_id': entry['path'], 'chunk_index': i}))
+    ids = [record[0] for record in records]
+    embeddings = ctx.embedder.encode([record[1] for record in records])
+    queries = ctx.embedder.encode([entry['query'] for entry in ctx.queries])
+    top_k = ctx.options['top_k']
+    batch_size = 256
+
+    normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    ground_truth = []
+    for query in queries:
+        scores = normalized @ (query / max(np.linalg.norm(query), 1e-12))
+        ground_truth.append([ids[row] for row in np.argpartition(-scores, top_k - 1)[:top_k]])
+
+    backends = {}
+    for backend in VECTOR_STORE_BACKENDS:
+        name = f"compare-{backend}"
+        store = ctx.open_vector_store(backend, name)
+
+        t0 = time.perf_counter()
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            store.add(
+                ids=[record[0] for record in batch],
+                embeddings=embeddings[start:start + batch_size],
+                documents=[record[1] for record in batch],
+                metadatas=[record[2] for record in batch],
+            )
+        add_seconds = time.perf_counter() - t0
+
+        # A fresh instance measures the cold open a new worker process pays.
+        t0 = time.perf_counter()
+        reopened = ctx.open_vector_store(backend, name)
+        reopened.query(queries[0], top_k=top_k)
+        open_seconds = time.perf_counter() - t0
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, ground_truth):
+            t0 = time.perf_counter()
+            found = reopened.query(query, top_k=top_k)
+            latencies.append(time.perf_counter() - t0)
+            recalls.append(_recall([chunk['id'] for chunk in found], expected))
+
+        concurrency = ctx.options['concurrency']
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda query: reopened.query(query, top_k=top_k), queries))
+        concurrent_seconds = time.perf_counter() - t0
+
+        doomed = [entry['path'] for entry in ctx.manifest[:max(1, len(ctx.manifest) // 10)]]
+        t0 = time.perf_counter()
+        for document_id in doomed:
+            reopened.delete(document_id=document_id)
+        delete_seconds = time.perf_counter() - t0
+
+        backends[backend] = {
+            'add_vectors_per_sec': len(records) / add_seconds if add_seconds else 0.0,
+            'open_first_query_ms': open_seconds * 1000,
+            'latency': percentiles(latencies),
+            'recall_at_k': statistics.fmean(recalls),
+            'concurrent_queries_per_sec': len(queries) / concurrent_seconds if concurrent_seconds else 0.0,
+            'delete_document_ms': delete_seconds * 1000 / len(doomed),
+            'disk_bytes': _directory_bytes(f"{ctx.workdir}/{name}"),
+        }
+
+    return {
+        'chunks': len(records),
+        'top_k': top_k,
+        'concurrency': ctx.options['concurrency'],
+        'backends': backends,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# Migration state of each layout: 0001 keeps the full text inline in the
+# document row, the latest moves it to a compressed side table.
+STORAGE_LAYOUTS = {
+    'inline': '0001_initial',
+    'compressed': None,
+}
+
+
+def _storage_models(alias: str, migration: Optional[str]):
+    """(DocumentSource, DocumentChunk, serializer class) for a layout migrated on `alias`"""
+    from django.db import connections
+    from django.db.migrations.loader import MigrationLoader
+    from ..models import DocumentChunk, DocumentSource
+    from ..serializers import DocumentSourceSerializer
+
+    if migration is None:
+        return DocumentSource, DocumentChunk, DocumentSourceSerializer
+
+    state = MigrationLoader(connections[alias]).project_state(('docs_assistant', migration))
+    legacy_source = state.apps.get_model('docs_assistant', 'DocumentSource')
+    meta = type('Meta', (DocumentSourceSerializer.Meta,), {'model': legacy_source})
+    serializer = type('LegacyDocumentSourceSerializer', (DocumentSourceSerializer,), {'Meta': meta})
+    return legacy_source, state.apps.get_model('docs_assistant', 'DocumentChunk'), serializer
+
+
+def bench_storage(ctx: BenchContext) -> Dict:
+    """DB size and document list/get latency through the ORM: inline text vs compressed side table"""
+    from django.core.management import call_command
+    from django.db import connections
+    from django.db.models import Count
+    from ..deletion import DELETING
+    from ..serializers import DocumentChunkSerializer
+
+    processor = ctx.processor()
+    documents = []
+    for entry in ctx.manifest:
+        text = processor.process_file(entry['path'])
+        documents.append((entry['title'], text, processor.chunk_text(text)))
+
+    layouts = {}
+    for layout, migration in STORAGE_LAYOUTS.items():
+        alias = f"bench_storage_{layout}"
+        _add_database(alias, {'ENGINE': 'django.db.backends.sqlite3',
+                              'NAME': f"{ctx.workdir}/storage-{layout}.sqlite3"})
+        if migration is None:
+            call_command('migrate', 'docs_assistant', database=alias, verbosity=0)
+        else:
+            call_command('migrate', 'docs_assistant', migration, database=alias, verbosity=0)
+        source_model, chunk_model, serializer = _storage_models(alias, migration)
+
+        ids = []
+        for title, text, chunks in documents:
+            document = source_model(title=title, source_type='file', processed=True,
+                                    processing_status='completed')
+            document.text_content = text
+            document.save(using=alias)
+            chunk_model.objects.using(alias).bulk_create(
+                chunk_model(document_id=document.id, content=chunk, chunk_index=index, metadata={})
+                for index, chunk in enumerate(chunks)
+            )
+            ids.append(document.id)
+
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+            cursor.execute('PRAGMA page_count')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_size')
+            page_size = cursor.fetchone()[0]
+
+        # What list_documents runs: the annotated queryset through the serializer.
+        list_latencies = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            queryset = (
+                source_model.objects.using(alias).exclude(processing_status=DELETING)
+                .annotate(chunks_total=Count('chunks')).order_by('-created_at')
+            )
+            serializer(queryset, many=True).data
+            list_latencies.append(time.perf_counter() - t0)
+
+        get_latencies, text_latencies, chunk_latencies = [], [], []
+        for document_id in ids:
+            t0 = time.perf_counter()
+            document = source_model.objects.using(alias).get(id=document_id)
+            get_latencies.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            document.text_content
+            text_latencies.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            DocumentChunkSerializer(document.chunks.all(), many=True).data
+            chunk_latencies.append(time.perf_counter() - t0)
+        connection.close()
+
+        layouts[layout] = {
+            'db_bytes': page_count * page_size,
+            'list_documents': percentiles(list_latencies),
+            'get_document': percentiles(get_latencies),
+            'load_text': percentiles(text_latencies),
+            'load_chunks': percentiles(chunk_latencies),
+        }
+
+    return {
+        'documents': len(documents),
+        'text_bytes': sum(len(text.encode('utf-8')) for _, text, _ in documents),
+        'layouts': layouts,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+DB_WRITE_MODES = {
+    # The stock Django SQLite setup: rollback journal, 5 s lock timeout,
+    # every request thread writing on its own connection.
+    'default': {'SQLITE_TUNING': False, 'OPTIONS': {}},
+    # WAL + synchronous=NORMAL + busy timeout, writes through run_write.
+    'tuned': {'SQLITE_TUNING': True, 'OPTIONS': {'timeout': 20}},
+}
+
+
+def _add_database(alias: str, config: Dict):
+    from django.db import connections
+    configured = connections.configure_settings({'default': connections.settings['default'], alias: config})
+    connections.settings[alias] = configured[alias]
+
+
+def bench_db_writes(ctx: BenchContext) -> Dict:
+    """Sustained chat-message writes under concurrent readers: stock SQLite vs tuned"""
+    from django.core.management import call_command
+    from django.db import OperationalError, connections, transaction
+    from ..db import get_write_queue
+    from ..models import ChatMessage, ChatSession
+
+    duration = ctx.options['db_write_seconds']
+    writers = ctx.options['concurrency']
+    readers = max(1, writers // 2)
+
+    modes = {}
+    for mode, config in DB_WRITE_MODES.items():
+        alias = f"bench_{mode}"
+        _add_database(alias, {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f"{ctx.workdir}/db-writes-{mode}.sqlite3",
+            **config,
+        })
+        call_command('migrate', database=alias, verbosity=0)
+        sessions = [ChatSession.objects.using(alias).create(title=f"bench {i}") for i in range(writers)]
+        connections[alias].close()
+
+        if mode == 'tuned':
+            write = get_write_queue(alias).run
+        else:
+            def write(fn):
+                with transaction.atomic(using=alias):
+                    return fn()
+
+        deadline = time.perf_counter() + duration
+
+        def writer(session):
+            latencies, errors = [], 0
+            while time.perf_counter() < deadline:
+                def store():
+                    ChatMessage.objects.using(alias).create(
+                        session=session, message_type='user', content='How do I configure the vector store?'
+                    )
+                    ChatSession.objects.using(alias).filter(id=session.id).update(title=session.title)
+                t0 = time.perf_counter()
+                try:
+                    write(store)
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - t0)
+            connections[alias].close()
+            return latencies, errors
+
+        def reader(session):
+            reads = 0
+            while time.perf_counter() < deadline:
+                list(ChatMessage.objects.using(alias).filter(session=session).order_by('-id')[:20])
+                list(ChatSession.objects.using(alias).order_by('-updated_at'))
+                reads += 1
+            connections[alias].close()
+            return reads
+
+        with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+            read_futures = [pool.submit(reader, sessions[i % writers]) for i in range(readers)]
+            write_futures = [pool.submit(writer, session) for session in sessions]
+            write_results = [future.result() for future in write_futures]
+            reads = sum(future.result() for future in read_futures)
+
+        latencies = [latency for samples, _ in write_results for latency in samples]
+        modes[mode] = {
+            'writes': len(latencies),
+            'writes_per_sec': len(latencies) / duration,
+            'locked_errors': sum(errors for _, errors in write_results),
+            'reads_per_sec': reads / duration,
+            'write_latency': percentiles(latencies),
+            'journal_mode': 'wal' if config['SQLITE_TUNING'] else 'delete',
+        }
+
+    return {
+        'seconds': duration,
+        'writers': writers,
+        'readers': readers,
+        'modes': modes,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _html_pages(ctx: BenchContext) -> List[bytes]:
+    """Saved pages from --html-dir, or synthetic documentation pages"""
+    directory = ctx.options['html_dir']
+    if directory:
+        pages = []
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(('.html', '.htm')):
+                with open(os.path.join(directory, name), 'rb') as file:
+                    pages.append(file.read())
+        return pages
+    return [
+        ctx.generator.render('html', i, ctx.options['document_size'])['body'].encode('utf-8')
+        for i in range(ctx.options['documents'])
+    ]
+
+
+def bench_html(ctx: BenchContext) -> Dict:
+    """Pages/sec and per-page latency of each HTML extraction engine"""
+    from ..html_extraction import HTML_EXTRACTORS, get_html_extractor
+
+    pages = _html_pages(ctx)
+    if not pages:
+        raise ValueError(f"No .html pages in {ctx.options['html_dir']}")
+    total_bytes = sum(len(page) for page in pages)
+
+    engines = {}
+    for name in HTML_EXTRACTORS:
+        try:
+            extractor = get_html_extractor(name)
+        except ImportError as exc:
+            engines[name] = {'error': str(exc)}
+            continue
+        extractor.extract(pages[0])
+
+        latencies, text_chars, sections = [], 0, 0
+        t0 = time.perf_counter()
+        for page in pages:
+            t1 = time.perf_counter()
+            extracted = extractor.extract(page)
+            latencies.append(time.perf_counter() - t1)
+            text_chars += len(extracted.text)
+            sections += len(extracted.sections)
+        elapsed = time.perf_counter() - t0
+
+        engines[name] = {
+            'pages_per_sec': len(pages) / elapsed,
+            'mb_per_sec': total_bytes / elapsed / 1e6,
+            'latency': percentiles(latencies),
+            'text_chars_per_page': text_chars / len(pages),
+            'sections_per_page': sections / len(pages),
+        }
+
+    return {
+        'pages': len(pages),
+        'source': ctx.options['html_dir'] or 'synthetic',
+        'mean_page_bytes': total_bytes / len(pages),
+        'engines': engines,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_routing(ctx: BenchContext) -> Dict:
+    """Flat chunk search vs document-routed search as the corpus grows"""
+    import random
+    from ..routing import index_document, routed_query
+
+    backend = ctx.options['vector_store']
+    chunk_store = ctx.open_vector_store(backend, 'routing')
+    document_index = ctx.open_vector_store(backend, 'routing-documents')
+    processor = ctx.processor()
+    kinds, size, top_k = ctx.options['kinds'], ctx.options['document_size'], ctx.options['top_k']
+    top_documents = ctx.options['top_documents']
+
+    manifest, chunks_total, sizes = [], 0, []
+    for target in sorted(ctx.options['routing_sizes']):
+        # Grow the same corpus to each size, so every step reuses the last.
+        for i in range(len(manifest), target):
+            document = ctx.generator.render(kinds[i % len(kinds)], i, size)
+            document_id = f"routing-{i:06d}"
+            chunks = processor.chunk_text(document['body'])
+            embeddings = ctx.embedder.encode(chunks)
+            chunk_store.add(
+                ids=[f"{document_id}_{n}" for n in range(len(chunks))],
+                embeddings=embeddings,
+                documents=chunks,
+                metadatas=[{'document_id': document_id, 'chunk_index': n} for n in range(len(chunks))],
+            )
+            index_document(document_index, document_id, embeddings, document['title'])
+            manifest.append({'path': document_id, 'topic': document['topic']})
+            chunks_total += len(chunks)
+
+        rng = random.Random(f"{ctx.options['seed']}:routing:{target}")
+        sample = rng.sample(manifest, min(len(manifest), ctx.options['queries']))
+        queries = ctx.generator.queries(sample, len(sample))
+        embeddings = ctx.embedder.encode([query['query'] for query in queries])
+
+        modes = {
+            'flat': lambda embedding: chunk_store.query(embedding, top_k=top_k),
+            'routed': lambda embedding: routed_query(chunk_store, document_index, embedding,
+                                                     top_k=top_k, top_documents=top_documents),
+        }
+        results = {}
+        found = {}
+        for mode, search in modes.items():
+            search(embeddings[0])
+            latencies, hits = [], 0
+            found[mode] = []
+            for query, embedding in zip(queries, embeddings):
+                t0 = time.perf_counter()
+                chunks = search(embedding)
+                latencies.append(time.perf_counter() - t0)
+                found[mode].append([chunk['id'] for chunk in chunks])
+                hits += any(chunk['metadata']['document_id'] == query['expected'] for chunk in chunks)
+            results[mode] = {'latency': percentiles(latencies), 'expected_document_hit_rate': hits / len(queries)}
+        results['routed']['recall_vs_flat'] = statistics.mean(
+            _recall(routed, flat) for routed, flat in zip(found['routed'], found['flat'])
+        )
+        sizes.append({'documents': len(manifest), 'chunks': chunks_total, **results})
+
+    return {
+        'backend': backend,
+        'top_k': top_k,
+        'top_documents': top_documents,
+        'sizes': sizes,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _legacy_prompt(query: str, context_chunks: List[Dict], conversation: str) -> str:
+    """The single-prompt layout generate_response used before chat messages"""
+    context = "\n\n".join(f"Source {i+1}: {chunk['content']}" for i, chunk in enumerate(context_chunks))
+    return (
+        "You are a helpful code documentation assistant. Use the following documentation context to "
+        "answer the user's question. If the context doesn't contain enough information to answer the "
+        f"question, say so clearly.\n\nContext:\n{context}\n\nConversation:\n{conversation}\n\n"
+        f"Question: {query}\n\nAnswer: Provide a detailed and helpful answer based on the documentation "
+        "context above. Include code examples when relevant."
+    )
+
+
+def bench_llm(ctx: BenchContext) -> Dict:
+    """Ollama load vs prompt-eval vs generation time: cold vs warmed start, prompt layouts"""
+    import ollama
+    from django.conf import settings
+    from ..llm import LLMClient, build_messages
+    from ..memory import ConversationMemory
+
+    ctx.ensure_ingested()
+    rag = ctx.rag_service()
+    queries = [entry['query'] for entry in ctx.queries][:ctx.options['chat_requests']]
+    contexts = [rag.retrieve_relevant_chunks(query) for query in queries]
+
+    def server():
+        return FakeOllamaServer(
+            model=ctx.options['model'],
+            latency=ctx.options['ollama_latency'],
+            prompt_eval_per_token=ctx.options['prompt_eval_per_token'],
+            load_time=ctx.options['ollama_load_time'],
+        )
+
+    # First request after startup, with and without the warm-up.
+    startup = {}
+    for mode in ('cold', 'warmed'):
+        with server() as fake:
+            llm = LLMClient(client=ollama.Client(host=fake.url), model=ctx.options['model'])
+            if mode == 'warmed':
+                llm.warm_up()
+            t0 = time.perf_counter()
+            _, stats = llm.chat(build_messages(queries[0], contexts[0]))
+            startup[mode] = {'first_request_seconds': time.perf_counter() - t0, **stats.as_dict()}
+
+    # One session, turn after turn: prompt tokens Ollama actually evaluates.
+    layouts = {}
+    for layout in ('single_prompt', 'chat_messages'):
+        with server() as fake:
+            llm = LLMClient(client=ollama.Client(host=fake.url), model=ctx.options['model'])
+            llm.warm_up()
+            turns, evaluated, total, seconds = [], [], [], []
+            for query, context_chunks in zip(queries, contexts):
+                memory = ConversationMemory(turns=turns[-settings.CHAT_HISTORY_MESSAGES:])
+                if layout == 'single_prompt':
+                    prompt = _legacy_prompt(query, context_chunks, memory.render())
+                    answer, stats = llm.generate(prompt)
+                    total.append(len(prompt.split()))
+                else:
+                    messages = build_messages(query, context_chunks, memory)
+                    answer, stats = llm.chat(messages)
+                    total.append(sum(len(message['content'].split()) for message in messages))
+                evaluated.append(stats.prompt_tokens)
+                seconds.append(stats.total_seconds)
+                turns += [('user', query), ('assistant', answer)]
+            layouts[layout] = {
+                'prompt_tokens_mean': statistics.mean(total),
+                'evaluated_tokens_mean': statistics.mean(evaluated),
+                'reused_fraction': 1 - sum(evaluated) / sum(total),
+                'server_seconds': percentiles(seconds),
+            }
+
+    return {
+        'requests': len(queries),
+        'load_time': ctx.options['ollama_load_time'],
+        'startup': startup,
+        'layouts': layouts,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+SUITES: Dict[str, Callable[[BenchContext], Dict]] = {
+    'ingest': bench_ingest,
+    'retrieval': bench_retrieval,
+    'chat': bench_chat,
+    'compression': bench_compression,
+    'vector_store': bench_vector_store,
+    'storage': bench_storage,
+    'db_writes': bench_db_writes,
+    'html': bench_html,
+    'routing': bench_routing,
+    'llm': bench_llm,
+}
+
+DEFAULT_OPTIONS = {
+    'documents': 200,
+    'document_size': 8000,
+    'kinds': KINDS,
+    'queries': 200,
+    'chat_requests': 50,
+    'concurrency': 8,
+    'top_k': 5,
+    'rerank_candidates': 50,
+    'vector_store': 'chroma',
+    'seed': 0,
+    'model': 'llama2',
+    'ollama_latency': 0.05,
+    'prompt_eval_per_token': 0.0,
+    'corpus_dir': None,
+    'db_write_seconds': 5.0,
+    'html_dir': None,
+    'routing_sizes': (250, 1000, 4000),
+    'top_documents': 20,
+    'ollama_load_time': 2.0,
+}
+
+
+def run_benchmarks(suites: List[str], **options) -> Dict:
+    """Run the named suites in order and return a JSON-serializable report"""
+    options = {**DEFAULT_OPTIONS, **options}
+    ctx = BenchContext(options)
+    results = {}
+    try:
+        ctx.ollama_server.start()
+        for name in suites:
+            results[name] = SUITES[name](ctx)
+    finally:
+        ctx.close()
+
+    return {
+        'options': {key: list(value) if isinstance(value, tuple) else value for key, value in options.items()},
+        'results': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
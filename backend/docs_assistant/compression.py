@@ -0,0 +1,386 @@
+# docs_assistant/compression.py
+"""Compressed in-memory embedding index (PCA or product quantization) with float32 reranking."""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class PCACompressor:
+    """Projects vectors onto the top principal components of the corpus"""
+
+    method = 'pca'
+
+    def __init__(self, components: int = 64):
+        self.components = components
+        self.mean = None
+        self.basis = None
+
+    def fit(self, vectors: np.ndarray) -> 'PCACompressor':
+        centered = vectors - vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(centered, full_matrices=False)
+        self.mean = vectors.mean(axis=0).astype(np.float32)
+        self.basis = vt[:self.components].astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return ((vectors - self.mean) @ self.basis.T).astype(np.float16)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # x.q ~= mean.q + y.(B q); mean.q is the same for every row, so it is
+        # dropped and the query is projected without centering.
+        return codes.astype(np.float32) @ (self.basis @ query)
+
+    def state(self) -> Dict:
+        return {'mean': self.mean, 'basis': self.basis}
+
+    def load_state(self, state: Dict):
+        self.mean = state['mean']
+        self.basis = state['basis']
+        self.components = self.basis.shape[0]
+
+    @property
+    def code_bytes(self) -> int:
+        return self.components * 2
+
+
+class ProductQuantizer:
+    """Splits vectors into subspaces and encodes each with a 256-entry codebook"""
+
+    method = 'pq'
+
+    def __init__(self, subspaces: int = 48, centroids: int = 256, iterations: int = 20, seed: int = 0):
+        self.subspaces = subspaces
+        self.centroids = centroids
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks = None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n, dimension = vectors.shape
+        if dimension % self.subspaces:
+            raise ValueError(f"Dimension {dimension} is not divisible by {self.subspaces} subspaces")
+        return vectors.reshape(n, self.subspaces, dimension // self.subspaces)
+
+    def fit(self, vectors: np.ndarray) -> 'ProductQuantizer':
+        rng = np.random.default_rng(self.seed)
+        parts = self._split(vectors)
+        k = min(self.centroids, len(vectors))
+        codebooks = []
+        for m in range(self.subspaces):
+            data = parts[:, m, :]
+            centers = data[rng.choice(len(data), size=k, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(data, centers)
+                counts = np.bincount(assignment, minlength=k)
+                sums = np.stack([np.bincount(assignment, weights=data[:, d], minlength=k)
+                                 for d in range(data.shape[1])], axis=1)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            codebooks.append(centers)
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+        return self
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (
+            (data ** 2).sum(axis=1, keepdims=True)
+            - 2 * data @ centers.T
+            + (centers ** 2).sum(axis=1)
+        )
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for m in range(self.subspaces):
+            codes[:, m] = self._nearest(parts[:, m, :], self.codebooks[m])
+        return codes
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Asymmetric distance computation: one inner-product lookup table per
+        # subspace, then a gather-and-sum over the codes.
+        table = np.einsum('mkd,md->mk', self.codebooks, query.reshape(self.subspaces, -1))
+        return table[np.arange(self.subspaces), codes].sum(axis=1)
+
+    def state(self) -> Dict:
+        return {'codebooks': self.codebooks}
+
+    def load_state(self, state: Dict):
+        self.codebooks = state['codebooks']
+        self.subspaces, self.centroids = self.codebooks.shape[:2]
+
+    @property
+    def code_bytes(self) -> int:
+        return self.subspaces
+
+
+COMPRESSORS = {
+    'pca': PCACompressor,
+    'pq': ProductQuantizer,
+}
+
+
+def make_compressor(method: str, **params):
+    try:
+        return COMPRESSORS[method](**params)
+    except KeyError:
+        raise ValueError(f"Unknown compression method: {method}")
+
+
+class CompressedIndex:
+    """Compressed codes in memory plus float32 vectors in an on-disk memmap.
+
+    Derived from the vector store; `manage.py build_compressed_index` rebuilds it.
+
+    Files in `directory`:
+        model.npz    compressor state
+        codes.npy    one code row per vector
+        vectors.f32  raw normalized float32 vectors, row-aligned with codes
+        ids.json     row ids, tombstoned rows, method and dimension
+        lock         flock()ed by every writer, so adds and deletes from
+                     several processes apply to the latest files in turn
+    """
+
+    def __init__(self, compressor, dimension: int, directory: Optional[str] = None):
+        self.compressor = compressor
+        self.dimension = dimension
+        self.directory = directory
+        self.ids: List[str] = []
+        self.codes = np.empty((0, 0), dtype=np.uint8)
+        self._rows: Dict[str, int] = {}
+        self._deleted = set()
+        self._vectors = None
+        self._lock = threading.Lock()
+        # Identity of the manifest this instance last read or wrote
+        self._stamp = None
+
+    @classmethod
+    def build(cls, method: str, ids: List[str], embeddings: np.ndarray,
+              directory: Optional[str] = None, train_size: int = 20000,
+              **params) -> 'CompressedIndex':
+        """Fit the compressor on the corpus and index every vector"""
+        vectors = _normalize(embeddings)
+        training = vectors
+        if len(vectors) > train_size:
+            rng = np.random.default_rng(0)
+            training = vectors[rng.choice(len(vectors), size=train_size, replace=False)]
+        compressor = make_compressor(method, **params).fit(training)
+        index = cls(compressor, vectors.shape[1], directory)
+        index.codes = compressor.encode(vectors)
+        index.ids = list(ids)
+        index._rows = {id_: row for row, id_ in enumerate(index.ids)}
+        index._vectors = vectors
+        if directory:
+            index.save()
+        return index
+
+    @property
+    def _paths(self) -> Dict[str, str]:
+        return {name: os.path.join(self.directory, name)
+                for name in ('model.npz', 'codes.npy', 'vectors.f32', 'ids.json', 'lock')}
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        # Imported here so the module (and in-memory indexes) work without it.
+        try:
+            import fcntl
+        except ImportError:
+            raise RuntimeError("An on-disk compressed index needs fcntl file locks, which this "
+                               "platform lacks; leave EMBEDDING_COMPRESSION unset")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._paths['lock'], 'ab') as file:
+            fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _manifest_stamp(self):
+        # Every write replaces the manifest, so a new inode means new state.
+        stat = os.stat(self._paths['ids.json'])
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def save(self):
+        with self._file_lock():
+            paths = self._paths
+            # Every file is swapped in atomically and the manifest goes last, so
+            # processes still mapping the old vectors file keep a consistent view
+            # until they notice the new manifest and reload.
+            self._replace(paths['model.npz'], lambda file: np.savez(file, **self.compressor.state()))
+            self._replace(paths['codes.npy'], lambda file: np.save(file, self.codes))
+            self._replace(paths['vectors.f32'], lambda file: np.asarray(self._vectors, dtype=np.float32).tofile(file))
+            self._write_manifest()
+            self._vectors = self._open_vectors()
+
+    @staticmethod
+    def _replace(path: str, write):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            write(file)
+        os.replace(tmp_path, path)
+
+    def _write_manifest(self):
+        manifest = {
+            'method': self.compressor.method,
+            'dimension': self.dimension,
+            'ids': self.ids,
+            'deleted': sorted(self._deleted),
+        }
+        self._replace(self._paths['ids.json'], lambda file: file.write(json.dumps(manifest).encode('utf-8')))
+        self._stamp = self._manifest_stamp()
+
+    def _open_vectors(self):
+        # Only the rows the manifest knows about; the file may end in rows
+        # of an add that failed before its manifest was written.
+        if not self.ids:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(self._paths['vectors.f32'], dtype=np.float32, mode='r',
+                         shape=(len(self.ids), self.dimension))
+
+    def _read(self):
+        """Replace the in-memory state with the files on disk"""
+        with open(self._paths['ids.json'], encoding='utf-8') as file:
+            manifest = json.load(file)
+        compressor = COMPRESSORS[manifest['method']]()
+        with np.load(self._paths['model.npz']) as state:
+            compressor.load_state({key: state[key] for key in state.files})
+
+        self.compressor = compressor
+        self.dimension = manifest['dimension']
+        self.ids = manifest['ids']
+        self._deleted = set(manifest['deleted'])
+        self._rows = {id_: row for row, id_ in enumerate(self.ids) if row not in self._deleted}
+        self.codes = np.load(self._paths['codes.npy'])
+        self._vectors = self._open_vectors()
+        self._stamp = self._manifest_stamp()
+
+    def _sync(self):
+        """Pick up writes of other instances; call with the file lock held"""
+        if self._manifest_stamp() != self._stamp:
+            self._read()
+
+    @classmethod
+    def load(cls, directory: str) -> 'CompressedIndex':
+        index = cls(None, 0, directory)
+        with index._file_lock(shared=True):
+            index._read()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids) - len(self._deleted)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Resident size of the searchable codes (the float32 file stays on disk)"""
+        return int(self.codes.nbytes)
+
+    def add(self, ids: List[str], embeddings: np.ndarray):
+        """Encode new vectors with the already-fitted compressor and append them"""
+        if not ids:
+            return
+        vectors = _normalize(embeddings)
+        if not self.directory:
+            with self._lock:
+                self._append(ids, vectors)
+                self._vectors = np.concatenate([self._vectors, vectors])
+            return
+
+        with self._lock, self._file_lock():
+            self._sync()
+            start = len(self.ids)
+            self._append(ids, vectors)
+            with open(self._paths['vectors.f32'], 'r+b') as file:
+                file.seek(start * self.dimension * 4)
+                vectors.tofile(file)
+                file.truncate(len(self.ids) * self.dimension * 4)
+            self._replace(self._paths['codes.npy'], lambda file: np.save(file, self.codes))
+            self._write_manifest()
+            self._vectors = self._open_vectors()
+
+    def _append(self, ids: List[str], vectors: np.ndarray):
+        # Encoded here, with the lock held, in case _sync loaded a rebuilt model
+        codes = self.compressor.encode(vectors)
+        self.codes = np.concatenate([self.codes, codes]) if len(self.codes) else codes
+        for id_ in ids:
+            if id_ in self._rows:
+                self._deleted.add(self._rows[id_])
+            self._rows[id_] = len(self.ids)
+            self.ids.append(id_)
+
+    def delete(self, ids: List[str]):
+        """Tombstone rows; they are dropped for good on the next rebuild"""
+        if not self.directory:
+            with self._lock:
+                self._deleted.update(self._rows.pop(id_) for id_ in ids if id_ in self._rows)
+            return
+
+        with self._lock, self._file_lock():
+            self._sync()
+            self._deleted.update(self._rows.pop(id_) for id_ in ids if id_ in self._rows)
+            self._write_manifest()
+
+    def search(self, query: np.ndarray, top_k: int = 5, candidates: int = 50) -> List[Tuple[str, float]]:
+        """Shortlist `candidates` rows by compressed score, rerank them exactly.
+
+        Returns (id, cosine distance) pairs, closest first.
+        """
+        with self._lock:
+            ids, codes, vectors, deleted = self.ids, self.codes, self._vectors, list(self._deleted)
+        if not len(codes):
+            return []
+        query = _normalize(query.reshape(-1))
+        approximate = self.compressor.scores(codes, query)
+        if deleted:
+            approximate[deleted] = -np.inf
+
+        shortlist = min(max(candidates, top_k), len(approximate))
+        rows = np.argpartition(-approximate, shortlist - 1)[:shortlist]
+        rows = rows[np.isfinite(approximate[rows])]
+        rows.sort()  # sequential reads from the memmap
+
+        exact = np.asarray(vectors[rows]) @ query
+        order = np.argsort(-exact)[:top_k]
+        return [(ids[rows[i]], float(1.0 - exact[i])) for i in order]
+
+
+_loaded_indexes: Dict[str, Tuple[float, CompressedIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def get_compressed_index(directory: str) -> Optional[CompressedIndex]:
+    """Process-wide cached index for `directory`, reloaded when it changes on disk"""
+    manifest = os.path.join(directory, 'ids.json')
+    try:
+        mtime = os.path.getmtime(manifest)
+    except OSError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded_indexes.get(directory)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, CompressedIndex.load(directory))
+            _loaded_indexes[directory] = cached
+        return cached[1]
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork() stays held in the child; see
+    # background._reset_after_fork.
+    global _loaded_indexes, _loaded_lock
+    _loaded_indexes = {}
+    _loaded_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,106 @@
+# docs_assistant/db.py
+"""SQLite tuning and serialized writes through one writer thread per database."""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# WAL lets readers run alongside the one writer SQLite allows.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """`connection_created` receiver applying the SQLite pragmas"""
+    if connection.vendor != 'sqlite' or not connection.settings_dict.get('SQLITE_TUNING', True):
+        return
+    with connection.cursor() as cursor:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+
+
+class WriteQueue:
+    """A single thread executing write callables, each in its own transaction"""
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        self.using = using
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name=f"documind-writer-{using}", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self._tasks.qsize()
+
+    def run(self, fn, *args, **kwargs):
+        """Execute `fn` on the writer thread and return its result"""
+        if threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        future = Future()
+        self._tasks.put((fn, args, kwargs, future))
+        return future.result()
+
+    def _work(self):
+        while True:
+            fn, args, kwargs, future = self._tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with transaction.atomic(using=self.using):
+                    result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+                # Start the next write on a fresh connection if this one broke
+                connection = connections[self.using]
+                if connection.connection is not None and not connection.is_usable():
+                    connection.close()
+            else:
+                future.set_result(result)
+
+
+_write_queues = {}
+_write_queues_lock = threading.Lock()
+
+
+def get_write_queue(using: str = DEFAULT_DB_ALIAS) -> WriteQueue:
+    with _write_queues_lock:
+        if using not in _write_queues:
+            _write_queues[using] = WriteQueue(using)
+        return _write_queues[using]
+
+
+def _reset_after_fork():
+    # Writer threads do not survive fork(); see background._reset_after_fork.
+    global _write_queues, _write_queues_lock
+    _write_queues = {}
+    _write_queues_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def write_queue_depth() -> int:
+    """Writes waiting on the writer threads already started"""
+    with _write_queues_lock:
+        return sum(write_queue.depth for write_queue in _write_queues.values())
+
+
+def uses_write_queue(using: str = DEFAULT_DB_ALIAS) -> bool:
+    return settings.DATABASE_WRITE_QUEUE and connections[using].vendor == 'sqlite'
+
+
+def run_write(fn, *args, using: str = DEFAULT_DB_ALIAS, **kwargs):
+    """Run a write (ORM calls inside `fn`) serialized per database, atomically"""
+    # Inside a transaction the caller already holds (or will take) the write
+    # lock; the writer thread's connection would only wait for it to end.
+    if uses_write_queue(using) and not connections[using].in_atomic_block:
+        return get_write_queue(using).run(fn, *args, **kwargs)
+    with transaction.atomic(using=using):
+        return fn(*args, **kwargs)
@@ -0,0 +1,100 @@
+# docs_assistant/deletion.py
+"""Bulk deletion of documents and chat sessions."""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+from .db import run_write
+from .models import ChatMessage, ChatSession, DocumentChunk, DocumentSource, DocumentText
+
+logger = logging.getLogger(__name__)
+
+DELETING = 'deleting'
+
+
+def _delete_where(model, column: str, value, limit: int = None) -> int:
+    # Plain DELETE: the ORM collector would load every instance first.
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        if limit is None:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} = %s", [value])
+        else:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {pk} IN "
+                f"(SELECT {pk} FROM {table} WHERE {column} = %s LIMIT %s)",
+                [value, limit],
+            )
+        return cursor.rowcount
+
+
+def _db_value(model, field_name: str, value):
+    return model._meta.get_field(field_name).get_db_prep_value(value, connection)
+
+
+def tombstone_document(document_id) -> bool:
+    """Hide a document from listings before it is purged; False if it does not exist"""
+    return run_write(
+        lambda: DocumentSource.objects.filter(id=document_id).update(processing_status=DELETING) > 0
+    )
+
+
+def delete_document_vectors(document_id, chunk_count: int, vector_store=None, compressed_index=None,
+                            document_index=None):
+    """Remove a document's embeddings so retrieval stops returning it"""
+    from .vector_store import get_document_index, get_vector_store
+    if vector_store is None:
+        vector_store = get_vector_store()
+    vector_store.delete(document_id=str(document_id))
+    if document_index is None:
+        document_index = get_document_index()
+    document_index.delete(ids=[str(document_id)])
+
+    if compressed_index is None:
+        from .services import default_compressed_index
+        compressed_index = default_compressed_index()
+    if compressed_index is not None and chunk_count:
+        # Chunk ids are f"{document_id}_{chunk_index}" with contiguous indexes.
+        compressed_index.delete([f"{document_id}_{i}" for i in range(chunk_count)])
+
+
+def purge_document(document_id, batch_size: int = None) -> int:
+    """Delete a document's rows in batches; returns the number of chunks deleted"""
+    batch_size = batch_size or settings.DOCUMENT_DELETE_BATCH_SIZE
+    key = _db_value(DocumentChunk, 'document', document_id)
+    deleted = 0
+    while True:
+        count = run_write(_delete_where, DocumentChunk, 'document_id', key, limit=batch_size)
+        deleted += count
+        if count < batch_size:
+            break
+
+    # The document row goes last, so a purge that dies half way leaves it
+    # tombstoned for `manage.py purge_deleted_documents` to finish.
+    def delete_document_rows():
+        _delete_where(DocumentText, 'document_id', key)
+        _delete_where(DocumentSource, 'id', _db_value(DocumentSource, 'id', document_id))
+
+    run_write(delete_document_rows)
+    return deleted
+
+
+def purge_document_and_vectors(document_id, chunk_count: int) -> int:
+    """Background task for large documents: embeddings first, so retrieval stops returning them, then rows"""
+    try:
+        delete_document_vectors(document_id, chunk_count)
+    except Exception:
+        # Same as a synchronous delete: the rows still go.
+        logger.warning("Could not delete vectors of document %s", document_id, exc_info=True)
+    return purge_document(document_id)
+
+
+def purge_session(session_id):
+    """Delete a chat session and its messages in one transaction"""
+    def delete_session_rows():
+        _delete_where(ChatMessage, 'session_id', _db_value(ChatMessage, 'session', session_id))
+        return _delete_where(ChatSession, 'id', _db_value(ChatSession, 'id', session_id)) > 0
+
+    return run_write(delete_session_rows)
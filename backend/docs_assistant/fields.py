@@ -0,0 +1,57 @@
+# docs_assistant/fields.py
+import zlib
+
+from django.db import models
+
+# One-byte codec tag in front of every stored value, so the codec can change
+# without rewriting old rows.
+RAW = b'r'
+ZLIB = b'z'
+
+# Below this size the zlib header and lookup cost outweigh the savings.
+MIN_COMPRESS_BYTES = 256
+
+
+def compress_text(text: str, level: int = 6) -> bytes:
+    data = text.encode('utf-8')
+    if len(data) >= MIN_COMPRESS_BYTES:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+    return RAW + data
+
+
+def decompress_text(blob) -> str:
+    blob = bytes(blob)
+    if not blob:
+        return ''
+    codec, payload = blob[:1], blob[1:]
+    if codec == ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    if codec == RAW:
+        return payload.decode('utf-8')
+    raise ValueError(f"Unknown text codec: {codec!r}")
+
+
+class CompressedTextField(models.BinaryField):
+    """Text stored as a zlib-compressed blob; reads and writes plain `str`"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        if isinstance(value, str):
+            value = compress_text(value)
+        return super().get_prep_value(value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,162 @@
+# docs_assistant/health.py
+"""Background-refreshed health snapshot behind the readiness and status endpoints."""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    def __init__(self, interval: Optional[float] = None, ttl: Optional[float] = None,
+                 embedding_model=None, vector_store=None, ollama_client=None):
+        self.interval = interval or settings.HEALTH_REFRESH_SECONDS
+        self.ttl = ttl or settings.HEALTH_SNAPSHOT_TTL
+        self._embedding_model = embedding_model
+        self._vector_store = vector_store
+        self._ollama_client = ollama_client
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _check_embedding_model(self) -> Dict:
+        if self._embedding_model is not None:
+            return {'ok': True}
+        from .services import embedding_model_loaded
+        return {'ok': embedding_model_loaded()}
+
+    def _check_database(self) -> Dict:
+        from .models import ChatSession, DocumentSource
+        return {
+            'ok': True,
+            'documents_count': DocumentSource.objects.count(),
+            'chat_sessions_count': ChatSession.objects.count(),
+        }
+
+    def _check_vector_store(self) -> Dict:
+        vector_store = self._vector_store
+        if vector_store is None:
+            from .vector_store import get_vector_store
+            vector_store = get_vector_store()
+        return {'ok': True, 'chunks': vector_store.count()}
+
+    def _check_ollama(self) -> Dict:
+        client = self._ollama_client
+        if client is None:
+            import ollama
+            client = ollama.Client(host=settings.OLLAMA_BASE_URL, timeout=settings.HEALTH_CHECK_TIMEOUT)
+        models = [model['name'] for model in client.list().get('models', [])]
+        model = settings.OLLAMA_MODEL
+        return {
+            'ok': True,
+            'model': model,
+            'model_available': any(name == model or name.startswith(f"{model}:") for name in models),
+        }
+
+    def _queue_depth(self) -> Dict:
+        from .background import get_background_queue
+        from .db import write_queue_depth
+        return {'background': get_background_queue().depth, 'writes': write_queue_depth()}
+
+    def refresh(self) -> Dict:
+        """Run every check now and publish the result"""
+        checks = {}
+        for name, check in (
+            ('embedding_model', self._check_embedding_model),
+            ('database', self._check_database),
+            ('vector_store', self._check_vector_store),
+            ('ollama', self._check_ollama),
+        ):
+            started = time.perf_counter()
+            try:
+                result = check()
+            except Exception as e:
+                result = {'ok': False, 'error': str(e)}
+            result['seconds'] = round(time.perf_counter() - started, 4)
+            result['required'] = name in settings.HEALTH_READINESS_CHECKS
+            checks[name] = result
+
+        try:
+            queue_depth = self._queue_depth()
+        except Exception as e:
+            queue_depth = {'error': str(e)}
+
+        snapshot = {
+            'ready': all(check['ok'] for check in checks.values() if check['required']),
+            'checked_at': time.time(),
+            'checks': checks,
+            'queue_depth': queue_depth,
+        }
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+            finally:
+                close_old_connections()
+            self._wake.wait(self.interval)
+
+    def start(self) -> 'HealthMonitor':
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='documind-health', daemon=True)
+                self._thread.start()
+        return self
+
+    def request_refresh(self):
+        """Wake the refresher early, e.g. once the models have loaded"""
+        self._wake.set()
+
+    def snapshot(self) -> Dict:
+        """Latest snapshot with its age; never runs the checks itself"""
+        self.start()
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            return {'ready': False, 'stale': False, 'status': 'starting', 'checks': {}, 'queue_depth': {}}
+
+        # A snapshot past its TTL means the refresher is stuck.
+        age = time.time() - snapshot['checked_at']
+        stale = age > self.ttl
+        return {
+            **snapshot,
+            'ready': snapshot['ready'] and not stale,
+            'stale': stale,
+            'age_seconds': round(age, 3),
+        }
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Process-wide monitor; its thread starts on first use"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor()
+        return _monitor
+
+
+def _reset_after_fork():
+    # The refresher thread does not survive fork(); see background._reset_after_fork.
+    global _monitor, _monitor_lock
+    _monitor = None
+    _monitor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
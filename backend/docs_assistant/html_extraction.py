@@ -0,0 +1,267 @@
+# docs_assistant/html_extraction.py
+"""Size-capped page download and pluggable HTML text extraction."""
+import bisect
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+import requests
+from django.conf import settings
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+BOILERPLATE_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'canvas',
+    'nav', 'footer', 'header', 'aside', 'form', 'button',
+})
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'blockquote', 'body', 'caption', 'dd', 'details', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'hr', 'li', 'main', 'ol', 'p', 'section', 'summary', 'table',
+    'tbody', 'thead', 'tfoot', 'tr', 'ul',
+})
+HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+CELL_TAGS = frozenset({'td', 'th'})
+PERMALINK_CHARACTERS = '¶§ '
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class PageTooLarge(ValueError):
+    pass
+
+
+def fetch_html(url: str, max_bytes: Optional[int] = None, timeout: int = 30) -> Tuple[bytes, Optional[str]]:
+    """Download a page, streaming; returns the body and the declared charset"""
+    max_bytes = max_bytes or settings.HTML_MAX_BYTES
+    with requests.get(url, headers=REQUEST_HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise PageTooLarge(f"Page is {length} bytes, the limit is {max_bytes}")
+
+        body = bytearray()
+        # iter_content undoes Content-Encoding, so the cap applies to what
+        # gets parsed rather than to the compressed transfer.
+        for block in response.iter_content(chunk_size=64 * 1024):
+            body += block
+            if len(body) > max_bytes:
+                raise PageTooLarge(f"Page is larger than {max_bytes} bytes")
+
+        charset = None
+        if 'charset=' in response.headers.get('Content-Type', ''):
+            charset = response.encoding
+        return bytes(body), charset
+
+
+class ExtractedPage:
+    def __init__(self, text: str, title: str = '', sections: Optional[List[Tuple[int, str]]] = None):
+        self.text = text
+        self.title = title
+        # (offset into text, "H1 > H2 > ...") in text order
+        self.sections = sections or []
+        self._offsets = [offset for offset, _ in self.sections]
+
+    def section_at(self, offset: int) -> str:
+        """Heading path of the section containing `offset`"""
+        index = bisect.bisect_right(self._offsets, offset) - 1
+        return self.sections[index][1] if index >= 0 else ''
+
+    def chunk_sections(self, chunks: List[str]) -> List[str]:
+        """Heading path for each chunk produced by `DocumentProcessor.chunk_text`"""
+        sections, position = [], 0
+        for chunk in chunks:
+            offset = self.text.find(chunk, position)
+            if offset < 0:
+                offset = position
+            sections.append(self.section_at(offset))
+            position = offset + 1
+        return sections
+
+
+class HTMLExtractor:
+    name = ''
+
+    def extract(self, html: bytes, encoding: Optional[str] = None) -> ExtractedPage:
+        raise NotImplementedError
+
+
+class LxmlExtractor(HTMLExtractor):
+    """One tree walk that skips boilerplate subtrees and records heading paths"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.etree
+        import lxml.html
+        self._etree = lxml.etree
+        self._html = lxml.html
+        self._local = threading.local()
+
+    def _parser(self, encoding: str):
+        # lxml parsers are not thread-safe; keep one per thread and encoding.
+        parsers = getattr(self._local, 'parsers', None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+        if encoding not in parsers:
+            parsers[encoding] = self._html.HTMLParser(encoding=encoding, remove_comments=True)
+        return parsers[encoding]
+
+    def _parse(self, html: bytes, encoding: str):
+        try:
+            return self._html.document_fromstring(html, parser=self._parser(encoding.lower()))
+        except LookupError:
+            # A charset libxml2 does not know, e.g. a typo in the page's <meta>
+            return self._html.document_fromstring(html, parser=self._parser('utf-8'))
+
+    def extract(self, html: bytes, encoding: Optional[str] = None) -> ExtractedPage:
+        if not encoding:
+            declared = _META_CHARSET.search(html[:4096])
+            encoding = declared.group(1).decode('ascii') if declared else 'utf-8'
+        try:
+            document = self._parse(html, encoding)
+        except self._etree.ParserError:
+            return ExtractedPage('')
+
+        title = ' '.join((document.findtext('.//title') or '').split())
+        # lxml elements are falsy when childless, so no `or` chain here.
+        root = document.find('.//main')
+        if root is None:
+            root = document.find('.//article')
+        if root is None:
+            root = next(iter(document.xpath(
+                ".//div[contains(concat(' ', normalize-space(@class), ' '), ' content ')]"
+            )), None)
+        skip = BOILERPLATE_TAGS
+        if root is None:
+            root = document
+        else:
+            # Inside the main content a <header> usually holds the page title.
+            skip = BOILERPLATE_TAGS - {'header'}
+        return self._walk(root, skip, title)
+
+    def _walk(self, root, skip, title: str) -> ExtractedPage:
+        lines, pieces, sections, headings = [], [], [], []
+        length = 0
+        pre_depth = 0
+
+        def flush():
+            nonlocal length
+            if not pieces:
+                return
+            raw = ''.join(pieces)
+            pieces.clear()
+            if pre_depth:
+                block = [line.rstrip() for line in raw.strip('\n').split('\n')]
+            else:
+                block = [' '.join(raw.split())]
+            for line in block:
+                if line or pre_depth:
+                    lines.append(line)
+                    length += len(line) + 1
+
+        walker = self._etree.iterwalk(root, events=('start', 'end'))
+        for event, element in walker:
+            tag = element.tag
+            if not isinstance(tag, str):
+                # Processing instructions and entities; keep only their tail.
+                if event == 'end' and element.tail:
+                    pieces.append(element.tail)
+                continue
+
+            if event == 'start':
+                if tag in skip:
+                    walker.skip_subtree()
+                    continue
+                if tag in BLOCK_TAGS or tag in HEADING_LEVELS or tag == 'pre':
+                    flush()
+                if tag == 'pre':
+                    pre_depth += 1
+                if element.text:
+                    pieces.append(element.text)
+                continue
+
+            if tag not in skip:
+                if tag in HEADING_LEVELS:
+                    start = length
+                    flush()
+                    if length > start:
+                        # Drop Sphinx/MkDocs permalink anchors ("Install¶")
+                        heading = lines[-1].rstrip(PERMALINK_CHARACTERS)
+                        length -= len(lines[-1]) - len(heading)
+                        lines[-1] = heading
+                        level = HEADING_LEVELS[tag]
+                        while headings and headings[-1][0] >= level:
+                            headings.pop()
+                        headings.append((level, heading))
+                        sections.append((start, ' > '.join(text for _, text in headings)))
+                elif tag == 'pre':
+                    flush()
+                    pre_depth -= 1
+                elif tag in BLOCK_TAGS or tag == 'br':
+                    flush()
+                elif tag in CELL_TAGS:
+                    pieces.append(' ')
+            if element is not root and element.tail:
+                pieces.append(element.tail)
+        flush()
+        return ExtractedPage('\n'.join(lines), title, sections)
+
+
+class SoupExtractor(HTMLExtractor):
+    name = 'bs4'
+
+    def extract(self, html: bytes, encoding: Optional[str] = None) -> ExtractedPage:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+        title = soup.title.get_text(strip=True) if soup.title else ''
+
+        # Remove script and style elements
+        for script in soup(["script", "style", "nav", "footer", "header"]):
+            script.decompose()
+
+        # Try to find main content areas
+        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+        text = main_content.get_text() if main_content else soup.get_text()
+
+        # Clean up the text
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return ExtractedPage(' '.join(chunk for chunk in chunks if chunk), title)
+
+
+HTML_EXTRACTORS = {
+    'lxml': LxmlExtractor,
+    'bs4': SoupExtractor,
+}
+
+_extractors = {}
+_extractors_lock = threading.Lock()
+
+
+def get_html_extractor(name: Optional[str] = None) -> HTMLExtractor:
+    """Shared extractor instance for `name` (default `settings.HTML_EXTRACTOR`)"""
+    name = name or settings.HTML_EXTRACTOR
+    with _extractors_lock:
+        if name not in _extractors:
+            try:
+                extractor = HTML_EXTRACTORS[name]
+            except KeyError:
+                raise ValueError(f"Unknown HTML extractor: {name}")
+            _extractors[name] = extractor()
+        return _extractors[name]
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork() stays held in the child; see
+    # background._reset_after_fork.
+    global _extractors, _extractors_lock
+    _extractors = {}
+    _extractors_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,166 @@
+# docs_assistant/llm.py
+"""Ollama client with model warm-up, keep-alive and per-response timings."""
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import ollama
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a helpful code documentation assistant. Answer the user's question using the "
+    "documentation context provided with it. If the context doesn't contain enough information "
+    "to answer the question, say so clearly. Provide a detailed and helpful answer based on the "
+    "documentation context and include code examples when relevant."
+)
+
+
+class LLMStats:
+    """Timings of one Ollama response (Ollama reports nanoseconds)"""
+
+    def __init__(self, response: Dict):
+        self.load_seconds = response.get('load_duration', 0) / 1e9
+        self.prompt_tokens = response.get('prompt_eval_count', 0)
+        self.prompt_eval_seconds = response.get('prompt_eval_duration', 0) / 1e9
+        self.generated_tokens = response.get('eval_count', 0)
+        self.generation_seconds = response.get('eval_duration', 0) / 1e9
+        self.total_seconds = response.get('total_duration', 0) / 1e9
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+class LLMMetrics:
+    """Process-wide totals of the timings of every Ollama response"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self._totals: Dict[str, float] = {}
+            self._maxima: Dict[str, float] = {}
+
+    def record(self, stats: LLMStats):
+        with self._lock:
+            self.requests += 1
+            for field, value in stats.as_dict().items():
+                self._totals[field] = self._totals.get(field, 0) + value
+                self._maxima[field] = max(self._maxima.get(field, 0), value)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            requests = self.requests
+            return {
+                'requests': requests,
+                'mean': {field: total / requests for field, total in self._totals.items()} if requests else {},
+                'max': dict(self._maxima),
+            }
+
+
+llm_metrics = LLMMetrics()
+
+
+def _keep_alive(value):
+    # Ollama reads numbers as seconds (negative: keep loaded forever) and
+    # strings as durations like "30m"; a bare "-1" from the environment
+    # must therefore be sent as a number.
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class LLMClient:
+    def __init__(self, client=None, model: Optional[str] = None, keep_alive=None):
+        self.client = client if client is not None else ollama.Client(host=settings.OLLAMA_BASE_URL)
+        self.model = model or settings.OLLAMA_MODEL
+        self.keep_alive = _keep_alive(keep_alive if keep_alive is not None else settings.OLLAMA_KEEP_ALIVE)
+
+    def _record(self, response: Dict, kind: str) -> LLMStats:
+        stats = LLMStats(response)
+        llm_metrics.record(stats)
+        logger.info(
+            "ollama %s %s: load %.3fs, prompt eval %d tokens in %.3fs, generation %d tokens in %.3fs",
+            self.model, kind, stats.load_seconds, stats.prompt_tokens, stats.prompt_eval_seconds,
+            stats.generated_tokens, stats.generation_seconds,
+        )
+        return stats
+
+    def warm_up(self) -> LLMStats:
+        """Load the model into memory without generating"""
+        response = self.client.generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+        return self._record(response, 'warm-up')
+
+    def chat(self, messages: List[Dict], options: Optional[Dict] = None) -> Tuple[str, LLMStats]:
+        response = self.client.chat(model=self.model, messages=messages, options=options,
+                                    keep_alive=self.keep_alive)
+        return response['message']['content'], self._record(response, 'chat')
+
+    def generate(self, prompt: str, options: Optional[Dict] = None) -> Tuple[str, LLMStats]:
+        response = self.client.generate(model=self.model, prompt=prompt, options=options,
+                                        keep_alive=self.keep_alive)
+        return response['response'], self._record(response, 'generate')
+
+    def list(self):
+        return self.client.list()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client for `settings.OLLAMA_MODEL`"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork() stays held in the child; see
+    # background._reset_after_fork.
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def warm_up_in_background():
+    """Load the model on a thread of its own; failures (Ollama not up yet) are only logged"""
+    def warm_up():
+        # Not on the background queue: a slow load would hold up purges and
+        # summaries behind it. The timeout bounds a hung Ollama.
+        client = LLMClient(client=ollama.Client(host=settings.OLLAMA_BASE_URL,
+                                                timeout=settings.OLLAMA_WARMUP_TIMEOUT))
+        try:
+            stats = client.warm_up()
+        except Exception:
+            logger.warning("Could not warm up Ollama model %s", settings.OLLAMA_MODEL, exc_info=True)
+        else:
+            logger.info("Ollama model %s loaded in %.2fs", settings.OLLAMA_MODEL, stats.load_seconds)
+
+    threading.Thread(target=warm_up, name='documind-ollama-warmup', daemon=True).start()
+
+
+def build_messages(query: str, context_chunks: List[Dict], memory=None) -> List[Dict]:
+    """Chat messages for an answer, most stable first so Ollama can reuse the cached prefix"""
+    messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+    if memory:
+        if memory.summary:
+            messages.append({'role': 'system', 'content': f"Summary of the earlier conversation:\n{memory.summary}"})
+        messages.extend({'role': role, 'content': content} for role, content in memory.turns if content)
+
+    context = "\n\n".join(f"Source {i+1}: {chunk['content']}" for i, chunk in enumerate(context_chunks))
+    messages.append({'role': 'user', 'content': f"Documentation context:\n{context or '(none found)'}\n\nQuestion: {query}"})
+    return messages
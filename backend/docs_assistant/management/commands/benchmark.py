@@ -0,0 +1,95 @@
+# docs_assistant/management/commands/benchmark.py
+import json
+import platform
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from docs_assistant.bench import SUITES, run_benchmarks
+from docs_assistant.bench.corpus import KINDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ingestion, retrieval and chat on a synthetic corpus using a "
+        "deterministic fake embedder and a local fake Ollama server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suites', default=','.join(SUITES),
+                            help=f"Comma-separated suites to run ({', '.join(SUITES)})")
+        parser.add_argument('--documents', type=int, default=200, help="Number of synthetic documents")
+        parser.add_argument('--document-size', type=int, default=8000, help="Approximate characters per document")
+        parser.add_argument('--kinds', default=','.join(KINDS), help="Document kinds to generate")
+        parser.add_argument('--queries', type=int, default=200, help="Number of retrieval queries")
+        parser.add_argument('--chat-requests', type=int, default=50, help="Number of chat requests")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent chat clients")
+        parser.add_argument('--top-k', type=int, default=5, help="Chunks retrieved per query")
+        parser.add_argument('--rerank-candidates', type=int, default=50,
+                            help="Compressed-index shortlist size reranked with float32 vectors")
+        parser.add_argument('--vector-store', default='chroma', choices=['chroma', 'mmap'],
+                            help="Vector store backend used by the ingest/retrieval/chat suites")
+        parser.add_argument('--seed', type=int, default=0, help="Corpus generation seed")
+        parser.add_argument('--ollama-latency', type=float, default=0.05,
+                            help="Simulated fixed Ollama latency per request, in seconds")
+        parser.add_argument('--ollama-load-time', type=float, default=2.0,
+                            help="Simulated model load time after startup or keep-alive expiry (llm suite)")
+        parser.add_argument('--prompt-eval-per-token', type=float, default=0.0,
+                            help="Simulated Ollama prompt evaluation cost per token, in seconds")
+        parser.add_argument('--corpus-dir', default=None,
+                            help="Directory to write the corpus to (defaults to a temporary directory)")
+        parser.add_argument('--db-write-seconds', type=float, default=5.0,
+                            help="How long each mode of the db_writes suite runs, in seconds")
+        parser.add_argument('--html-dir', default=None,
+                            help="Directory of saved .html pages for the html suite (default: synthetic pages)")
+        parser.add_argument('--routing-sizes', default='250,1000,4000',
+                            help="Comma-separated corpus sizes (documents) for the routing suite")
+        parser.add_argument('--top-documents', type=int, default=20,
+                            help="Documents selected by the first routing pass")
+        parser.add_argument('--output', default=None, help="Write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        suites = [name.strip() for name in options['suites'].split(',') if name.strip()]
+        unknown = [name for name in suites if name not in SUITES]
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(unknown)}")
+
+        kinds = tuple(kind.strip() for kind in options['kinds'].split(',') if kind.strip())
+        unknown = [kind for kind in kinds if kind not in KINDS]
+        if unknown:
+            raise CommandError(f"Unknown document kinds: {', '.join(unknown)}")
+
+        report = run_benchmarks(
+            suites,
+            documents=options['documents'],
+            document_size=options['document_size'],
+            kinds=kinds,
+            queries=options['queries'],
+            chat_requests=options['chat_requests'],
+            concurrency=options['concurrency'],
+            top_k=options['top_k'],
+            rerank_candidates=options['rerank_candidates'],
+            vector_store=options['vector_store'],
+            seed=options['seed'],
+            ollama_latency=options['ollama_latency'],
+            prompt_eval_per_token=options['prompt_eval_per_token'],
+            ollama_load_time=options['ollama_load_time'],
+            corpus_dir=options['corpus_dir'],
+            db_write_seconds=options['db_write_seconds'],
+            html_dir=options['html_dir'],
+            routing_sizes=tuple(int(size) for size in options['routing_sizes'].split(',') if size.strip()),
+            top_documents=options['top_documents'],
+        )
+        report['meta'] = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        }
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
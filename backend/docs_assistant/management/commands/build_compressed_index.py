@@ -0,0 +1,32 @@
+# docs_assistant/management/commands/build_compressed_index.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from docs_assistant.compression import COMPRESSORS, CompressedIndex
+from docs_assistant.vector_store import get_vector_store
+
+
+class Command(BaseCommand):
+    help = "Fit the embedding compressor on the stored corpus and (re)build the compressed index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', default=settings.EMBEDDING_COMPRESSION or 'pq',
+                            choices=sorted(COMPRESSORS), help="Compression method")
+        parser.add_argument('--components', type=int, default=64, help="PCA components to keep")
+        parser.add_argument('--subspaces', type=int, default=48, help="Product quantization subspaces")
+
+    def handle(self, *args, **options):
+        ids, embeddings = get_vector_store().all_embeddings()
+        if not ids:
+            raise CommandError("The vector store is empty; nothing to index.")
+
+        params = {'components': options['components']} if options['method'] == 'pca' else {'subspaces': options['subspaces']}
+        index = CompressedIndex.build(
+            options['method'], ids, embeddings,
+            directory=settings.EMBEDDING_COMPRESSION_DIRECTORY, **params
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index)} vectors with {options['method']} "
+            f"({index.memory_bytes / len(index):.0f} bytes/chunk in memory) "
+            f"into {settings.EMBEDDING_COMPRESSION_DIRECTORY}"
+        ))
@@ -0,0 +1,17 @@
+# docs_assistant/management/commands/build_document_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from docs_assistant.models import DocumentSource
+from docs_assistant.routing import rebuild_document_index
+from docs_assistant.vector_store import get_document_index, get_vector_store
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-document centroid embeddings used for document-level routing."
+
+    def handle(self, *args, **options):
+        titles = {str(pk): title for pk, title in DocumentSource.objects.values_list('id', 'title')}
+        documents = rebuild_document_index(get_vector_store(), get_document_index(), titles)
+        if not documents:
+            raise CommandError("The vector store is empty; nothing to index.")
+        self.stdout.write(self.style.SUCCESS(f"Indexed centroids for {documents} documents"))
@@ -0,0 +1,15 @@
+# docs_assistant/management/commands/compact_vector_store.py
+from django.core.management.base import BaseCommand, CommandError
+
+from docs_assistant.vector_store import MmapVectorStore, get_vector_store
+
+
+class Command(BaseCommand):
+    help = "Drop deleted rows from the memory-mapped vector store (mmap backend only)."
+
+    def handle(self, *args, **options):
+        store = get_vector_store()
+        if not isinstance(store, MmapVectorStore):
+            raise CommandError("Compaction only applies to VECTOR_STORE_BACKEND='mmap'.")
+        store.compact()
+        self.stdout.write(self.style.SUCCESS(f"Compacted vector store: {store.count()} live vectors"))
@@ -0,0 +1,20 @@
+# docs_assistant/management/commands/purge_deleted_documents.py
+from django.core.management.base import BaseCommand
+
+from docs_assistant.deletion import DELETING, delete_document_vectors, purge_document
+from docs_assistant.models import DocumentChunk, DocumentSource
+
+
+class Command(BaseCommand):
+    help = "Finish deleting documents left tombstoned (e.g. by a restart during a background purge)."
+
+    def handle(self, *args, **options):
+        document_ids = list(
+            DocumentSource.objects.filter(processing_status=DELETING).values_list('id', flat=True)
+        )
+        for document_id in document_ids:
+            chunk_count = DocumentChunk.objects.filter(document_id=document_id).count()
+            delete_document_vectors(document_id, chunk_count)
+            deleted = purge_document(document_id)
+            self.stdout.write(f"Purged document {document_id} ({deleted} chunks)")
+        self.stdout.write(self.style.SUCCESS(f"Purged {len(document_ids)} documents"))
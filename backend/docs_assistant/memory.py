@@ -0,0 +1,146 @@
+# docs_assistant/memory.py
+"""Bounded conversation memory: a rolling summary plus the latest turns."""
+import logging
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from .background import get_background_queue
+from .db import run_write
+from .llm import get_llm_client
+from .models import ChatMessage, ChatSession
+
+logger = logging.getLogger(__name__)
+
+ROLE_NAMES = {'user': 'User', 'assistant': 'Assistant'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and code)"""
+    return (len(text) + 3) // 4
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + ' ...'
+
+
+class ConversationMemory:
+    def __init__(self, summary: str = '', turns: Optional[List[Tuple[str, str]]] = None):
+        self.summary = summary
+        self.turns = turns or []
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        if self.turns:
+            parts.append("Recent messages:\n" + "\n".join(
+                f"{ROLE_NAMES.get(role, role)}: {content}" for role, content in self.turns
+            ))
+        return "\n\n".join(parts)
+
+    @property
+    def last_user_message(self) -> str:
+        for role, content in reversed(self.turns):
+            if role == 'user':
+                return content
+        return ''
+
+
+def load_memory(session: ChatSession, budget: Optional[int] = None) -> ConversationMemory:
+    """Summary plus as many of the newest unsummarized messages as fit the budget"""
+    budget = budget or settings.CHAT_MEMORY_TOKEN_BUDGET
+    summary = _truncate_to_tokens(session.summary, budget // 2) if session.summary else ''
+    remaining = budget - estimate_tokens(summary)
+
+    recent = (
+        session.messages.filter(id__gt=session.summarized_through)
+        .order_by('-id')
+        .values_list('message_type', 'content')[:settings.CHAT_HISTORY_MESSAGES]
+    )
+    turns = []
+    for role, content in recent:
+        cost = estimate_tokens(content)
+        if cost > remaining:
+            if not turns and remaining > 0:
+                turns.append((role, _truncate_to_tokens(content, remaining)))
+            break
+        turns.append((role, content))
+        remaining -= cost
+    turns.reverse()
+    return ConversationMemory(summary, turns)
+
+
+def rewrite_query(client, query: str, memory: ConversationMemory) -> str:
+    """Turn a follow-up question into a standalone query for retrieval"""
+    if not memory.turns or not settings.CHAT_QUERY_REWRITE:
+        return query
+
+    prompt = f"""Rewrite the user's latest question as a single standalone search query for a documentation index. Resolve pronouns and references using the conversation. Reply with the query only.
+
+{memory.render()}
+
+Latest question: {query}
+
+Standalone query:"""
+    try:
+        response, _ = client.generate(prompt, options={'temperature': 0, 'num_predict': 64})
+        lines = response.strip().splitlines()
+        rewritten = lines[0].strip().strip('"').strip() if lines else ''
+        if rewritten:
+            return rewritten
+    except Exception:
+        logger.warning("Query rewrite failed; falling back to the raw follow-up", exc_info=True)
+    # Without the model, anchor the follow-up to the previous question.
+    return f"{memory.last_user_message} {query}".strip()
+
+
+def update_session_summary(session_id, client=None):
+    """Fold messages older than the recent window into the session summary"""
+    session = ChatSession.objects.filter(id=session_id).only('id', 'summary', 'summarized_through').first()
+    if session is None:
+        return
+
+    pending = list(
+        ChatMessage.objects.filter(session_id=session_id, id__gt=session.summarized_through)
+        .order_by('id')
+        .values_list('id', 'message_type', 'content')
+    )
+    foldable = pending[:-settings.CHAT_HISTORY_MESSAGES] if settings.CHAT_HISTORY_MESSAGES else pending
+    if not foldable:
+        return
+
+    transcript = "\n".join(f"{ROLE_NAMES.get(role, role)}: {content}" for _, role, content in foldable)
+    prompt = f"""Update the running summary of a conversation between a user and a code documentation assistant. Keep the topics, named APIs, files and decisions the user may refer back to. Stay under {settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.
+
+Current summary:
+{session.summary or '(empty)'}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+
+    client = client or get_llm_client()
+    response, _ = client.generate(
+        prompt, options={'temperature': 0.2, 'num_predict': settings.CHAT_SUMMARY_MAX_TOKENS}
+    )
+    summary = _truncate_to_tokens(response.strip(), settings.CHAT_SUMMARY_MAX_TOKENS)
+
+    # Compare-and-set so a concurrent update of the same session cannot
+    # move the summary backwards.
+    run_write(
+        ChatSession.objects.filter(id=session_id, summarized_through=session.summarized_through).update,
+        summary=summary, summarized_through=foldable[-1][0]
+    )
+
+
+def schedule_summary_update(session: ChatSession):
+    """Queue a summary update once enough messages sit outside the recent window"""
+    unsummarized = session.messages.filter(id__gt=session.summarized_through).count()
+    if unsummarized >= settings.CHAT_HISTORY_MESSAGES + settings.CHAT_SUMMARY_BATCH_MESSAGES:
+        get_background_queue().submit(update_session_summary, session.id)
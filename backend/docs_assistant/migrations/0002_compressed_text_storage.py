@@ -0,0 +1,99 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import docs_assistant.fields
+
+BATCH_SIZE = 500
+
+
+def move_text_out_of_rows(apps, schema_editor):
+    DocumentSource = apps.get_model('docs_assistant', 'DocumentSource')
+    DocumentText = apps.get_model('docs_assistant', 'DocumentText')
+    DocumentChunk = apps.get_model('docs_assistant', 'DocumentChunk')
+    db = schema_editor.connection.alias
+
+    texts = []
+    for document in DocumentSource.objects.using(db).only('id', 'text_content').iterator(chunk_size=BATCH_SIZE):
+        if document.text_content:
+            texts.append(DocumentText(
+                document_id=document.id, content=document.text_content, size=len(document.text_content)
+            ))
+        if len(texts) >= BATCH_SIZE:
+            DocumentText.objects.using(db).bulk_create(texts)
+            texts = []
+    DocumentText.objects.using(db).bulk_create(texts)
+
+    chunks = []
+    for chunk in DocumentChunk.objects.using(db).only('id', 'content').iterator(chunk_size=BATCH_SIZE):
+        chunk.compressed_content = chunk.content
+        chunks.append(chunk)
+        if len(chunks) >= BATCH_SIZE:
+            DocumentChunk.objects.using(db).bulk_update(chunks, ['compressed_content'])
+            chunks = []
+    DocumentChunk.objects.using(db).bulk_update(chunks, ['compressed_content'])
+
+
+def move_text_back_into_rows(apps, schema_editor):
+    DocumentSource = apps.get_model('docs_assistant', 'DocumentSource')
+    DocumentText = apps.get_model('docs_assistant', 'DocumentText')
+    DocumentChunk = apps.get_model('docs_assistant', 'DocumentChunk')
+    db = schema_editor.connection.alias
+
+    for text in DocumentText.objects.using(db).iterator(chunk_size=BATCH_SIZE):
+        DocumentSource.objects.using(db).filter(id=text.document_id).update(text_content=text.content)
+
+    chunks = []
+    for chunk in DocumentChunk.objects.using(db).only('id', 'compressed_content').iterator(chunk_size=BATCH_SIZE):
+        chunk.content = chunk.compressed_content or ''
+        chunks.append(chunk)
+        if len(chunks) >= BATCH_SIZE:
+            DocumentChunk.objects.using(db).bulk_update(chunks, ['content'])
+            chunks = []
+    DocumentChunk.objects.using(db).bulk_update(chunks, ['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs_assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='docs_assistant.documentsource')),
+                ('content', docs_assistant.fields.CompressedTextField()),
+                ('size', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='compressed_content',
+            field=docs_assistant.fields.CompressedTextField(null=True),
+        ),
+        migrations.RunPython(move_text_out_of_rows, move_text_back_into_rows),
+        migrations.RemoveField(
+            model_name='documentsource',
+            name='text_content',
+        ),
+        # Lets the reverse migration re-add the column to a populated table.
+        migrations.AlterField(
+            model_name='documentchunk',
+            name='content',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RemoveField(
+            model_name='documentchunk',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='documentchunk',
+            old_name='compressed_content',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='documentchunk',
+            name='content',
+            field=docs_assistant.fields.CompressedTextField(),
+        ),
+    ]
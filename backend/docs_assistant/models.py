@@ -1,5 +1,6 @@
 from django.db import models
 import uuid
+from .fields import CompressedTextField
 
 
 class DocumentSource(models.Model):
@@ -14,7 +15,6 @@ class DocumentSource(models.Model):
     source_type = models.CharField(max_length=10, choices=SOURCE_TYPES)
     url = models.URLField(blank=True, null=True)
     file = models.FileField(upload_to='documents/', blank=True, null=True)
-    text_content = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
     processing_status = models.CharField(max_length=20, default='pending')
@@ -23,10 +23,44 @@ class DocumentSource(models.Model):
     def __str__(self):
         return self.title
     
+    # The extracted text lives in DocumentText so that listing and fetching
+    # documents never drags megabytes of text along; it is loaded on first
+    # access and written back on save() when it was assigned.
+    @property
+    def text_content(self) -> str:
+        if not hasattr(self, '_text_content'):
+            try:
+                self._text_content = self.extracted_text.content
+            except DocumentText.DoesNotExist:
+                self._text_content = ''
+        return self._text_content
+    
+    @text_content.setter
+    def text_content(self, value: str):
+        self._text_content = value
+        self._text_content_changed = True
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if getattr(self, '_text_content_changed', False):
+            DocumentText.objects.db_manager(self._state.db).update_or_create(
+                document=self,
+                defaults={'content': self._text_content, 'size': len(self._text_content)}
+            )
+            self._text_content_changed = False
+
+
+class DocumentText(models.Model):
+    document = models.OneToOneField(
+        DocumentSource, on_delete=models.CASCADE, primary_key=True, related_name='extracted_text'
+    )
+    content = CompressedTextField()
+    size = models.IntegerField(default=0)
+    
     
 class DocumentChunk(models.Model):
     document = models.ForeignKey(DocumentSource, on_delete=models.CASCADE, related_name='chunks')
-    content = models.TextField()
+    content = CompressedTextField()
     chunk_index = models.IntegerField()
     metadata = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -39,6 +73,9 @@ class ChatSession(models.Model):
     title = models.CharField(max_length=255, default='New Chat')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Rolling summary of every message up to and including summarized_through
+    summary = models.TextField(blank=True)
+    summarized_through = models.BigIntegerField(default=0)
     
     def __str__(self):
         return self.title
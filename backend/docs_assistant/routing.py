@@ -0,0 +1,57 @@
+# docs_assistant/routing.py
+"""Document-level routing: chunk search restricted to the documents nearest the query."""
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+
+def document_centroid(embeddings: np.ndarray) -> np.ndarray:
+    """Normalized mean of the normalized chunk embeddings"""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    centroid = (vectors / norms).mean(axis=0)
+    return centroid / (np.linalg.norm(centroid) or 1.0)
+
+
+def index_document(document_index, document_id: str, embeddings: np.ndarray, title: str = ''):
+    """Store (or replace) the centroid of one document"""
+    if not len(embeddings):
+        return
+    document_index.delete(ids=[document_id])
+    document_index.add(
+        ids=[document_id],
+        embeddings=document_centroid(embeddings)[None, :],
+        documents=[title],
+        metadatas=[{'document_id': document_id, 'title': title, 'chunks': len(embeddings)}],
+    )
+
+
+def rebuild_document_index(vector_store, document_index, titles: Optional[Dict[str, str]] = None) -> int:
+    """Recompute every document centroid from the chunk store; returns the document count"""
+    titles = titles or {}
+    ids, embeddings = vector_store.all_embeddings()
+    if not ids:
+        return 0
+
+    # Chunk ids are f"{document_id}_{chunk_index}".
+    document_ids = np.array([chunk_id.rsplit('_', 1)[0] for chunk_id in ids])
+    order = np.argsort(document_ids, kind='stable')
+    unique, starts = np.unique(document_ids[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    for document_id, start, end in zip(unique.tolist(), starts.tolist(), bounds):
+        index_document(document_index, document_id, embeddings[order[start:end]], titles.get(document_id, ''))
+    return len(unique)
+
+
+def routed_query(vector_store, document_index, embedding: np.ndarray, top_k: int = 5,
+                 top_documents: Optional[int] = None) -> List[Dict]:
+    """Chunk search restricted to the documents whose centroids are closest to the query"""
+    top_documents = top_documents or settings.DOCUMENT_ROUTING_TOP_DOCUMENTS
+    if document_index.count() <= top_documents:
+        # Every document would be selected anyway.
+        return vector_store.query(embedding, top_k=top_k)
+
+    documents = document_index.query(embedding, top_k=top_documents)
+    return vector_store.query(embedding, top_k=top_k, document_ids=[document['id'] for document in documents])
@@ -3,6 +3,8 @@ from rest_framework import serializers
 from .models import DocumentSource, ChatSession, ChatMessage, DocumentChunk
 
 class DocumentChunkSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(read_only=True)
+    
     class Meta:
         model = DocumentChunk
         fields = ['content', 'chunk_index', 'metadata', 'created_at']
@@ -20,6 +22,9 @@ class DocumentSourceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'processed', 'processing_status']
     
     def get_chunks_count(self, obj):
+        # list_documents annotates the count to avoid one query per row
+        if hasattr(obj, 'chunks_total'):
+            return obj.chunks_total
         return obj.chunks.count()
 
 class ChatMessageSerializer(serializers.ModelSerializer):
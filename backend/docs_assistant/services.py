@@ -1,8 +1,4 @@
 # docs_assistant/services.py
-import requests
-import ollama
-from bs4 import BeautifulSoup
-import chromadb
 from sentence_transformers import SentenceTransformer
 from django.conf import settings
 import PyPDF2
@@ -12,42 +8,79 @@ import html2text
 from typing import List, Dict, Tuple
 import re
 import os
+import threading
+from .compression import get_compressed_index
+from .html_extraction import ExtractedPage, fetch_html, get_html_extractor
+from .llm import LLMClient, build_messages, get_llm_client
+from .memory import ConversationMemory, rewrite_query
+from .routing import index_document, routed_query
+from .vector_store import get_document_index, get_vector_store
+
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Process-wide sentence-transformer, loaded on first use"""
+    global _embedding_model
+    with _embedding_model_lock:
+        if _embedding_model is None:
+            _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        return _embedding_model
+
+
+def embedding_model_loaded() -> bool:
+    return _embedding_model is not None
+
+
+def _reset_after_fork():
+    # A model loaded before the fork is kept (its pages are shared), but a
+    # load still in progress died with its thread and left the lock held.
+    global _embedding_model_lock
+    _embedding_model_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def default_compressed_index():
+    """The on-disk compressed index, if compression is enabled and it has been built"""
+    if not settings.EMBEDDING_COMPRESSION:
+        return None
+    return get_compressed_index(settings.EMBEDDING_COMPRESSION_DIRECTORY)
+
+
+def default_document_index():
+    """The document index when routing is enabled, else None"""
+    return get_document_index() if settings.DOCUMENT_ROUTING else None
+
 
 class DocumentProcessor:
-    def __init__(self):
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
-        self.collection = self.chroma_client.get_or_create_collection("documentation")
+    def __init__(self, embedding_model=None, vector_store=None, compressed_index=None, html_extractor=None,
+                 document_index=None):
+        # Dependencies can be injected (e.g. by the benchmark harness); by
+        # default the real model and the configured vector store are used.
+        self.embedding_model = embedding_model if embedding_model is not None else get_embedding_model()
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        self.compressed_index = compressed_index if compressed_index is not None else default_compressed_index()
+        self.html_extractor = html_extractor if html_extractor is not None else get_html_extractor()
+        # Centroids are kept even with routing off, so it can be switched on later.
+        self.document_index = document_index if document_index is not None else get_document_index()
         
+    def extract_url(self, url: str) -> ExtractedPage:
+        """Download a page and extract its main text and section headings"""
+        html, encoding = fetch_html(url)
+        page = self.html_extractor.extract(html, encoding)
+        if not page.text.strip():
+            raise ValueError("No text could be extracted from the page")
+        return page
+
     def process_url(self, url: str) -> str:
         """Extract text content from a URL"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            
-            # Try to find main content areas
-            main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
-            if main_content:
-                text = main_content.get_text()
-            else:
-                text = soup.get_text()
-            
-            # Clean up the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text
-            
+            return self.extract_url(url).text
         except Exception as e:
             raise Exception(f"Error processing URL: {str(e)}")
     
@@ -122,100 +155,106 @@ class DocumentProcessor:
         
         return chunks
     
-    def store_chunks(self, document_id: str, chunks: List[str], metadata: Dict = None):
+    def store_chunks(self, document_id: str, chunks: List[str], metadata: Dict = None,
+                     chunk_metadata: List[Dict] = None):
         """Store document chunks in vector database"""
         if not chunks:
             return
             
-        embeddings = self.embedding_model.encode(chunks).tolist()
+        # Keep the float32 array; going through .tolist() boxes every
+        # component into a Python float.
+        embeddings = self.embedding_model.encode(chunks)
         
         ids = [f"{document_id}_{i}" for i in range(len(chunks))]
-        metadatas = [{"document_id": document_id, "chunk_index": i, **(metadata or {})} 
+        metadatas = [{"document_id": document_id, "chunk_index": i, **(metadata or {}),
+                      **(chunk_metadata[i] if chunk_metadata else {})}
                     for i in range(len(chunks))]
         
-        self.collection.add(
+        self.vector_store.add(
+            ids=ids,
             embeddings=embeddings,
             documents=chunks,
-            metadatas=metadatas,
-            ids=ids
+            metadatas=metadatas
         )
+        if self.compressed_index is not None:
+            self.compressed_index.add(ids, embeddings)
+        index_document(self.document_index, document_id, embeddings, (metadata or {}).get('title', ''))
 
 class RAGService:
-    def __init__(self):
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
-        self.collection = self.chroma_client.get_or_create_collection("documentation")
-        self.ollama_client = ollama.Client(host=settings.OLLAMA_BASE_URL)
+    def __init__(self, embedding_model=None, vector_store=None, ollama_client=None, compressed_index=None,
+                 document_index=None):
+        self.embedding_model = embedding_model if embedding_model is not None else get_embedding_model()
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        # An injected raw Ollama client (e.g. pointed at a fake server) gets
+        # the same keep-alive and timing handling as the shared one.
+        self.llm = LLMClient(client=ollama_client) if ollama_client is not None else get_llm_client()
+        self.compressed_index = compressed_index if compressed_index is not None else default_compressed_index()
+        self.document_index = document_index if document_index is not None else default_document_index()
     
     def retrieve_relevant_chunks(self, query: str, top_k: int = 5) -> List[Dict]:
         """Retrieve most relevant document chunks for a query"""
-        query_embedding = self.embedding_model.encode([query]).tolist()
+        query_embedding = self.embedding_model.encode([query])
+        if self.compressed_index is not None:
+            return self._retrieve_compressed(query_embedding[0], top_k)
+        if self.document_index is not None:
+            return routed_query(self.vector_store, self.document_index, query_embedding[0], top_k=top_k)
         
-        results = self.collection.query(
-            query_embeddings=query_embedding,
-            n_results=top_k
+        return self.vector_store.query(query_embedding[0], top_k=top_k)
+    
+    def _retrieve_compressed(self, query_embedding, top_k: int) -> List[Dict]:
+        """Shortlist with the compressed index, then fetch text and metadata from the vector store"""
+        hits = self.compressed_index.search(
+            query_embedding, top_k=top_k, candidates=settings.EMBEDDING_RERANK_CANDIDATES
         )
+        if not hits:
+            return []
         
-        relevant_chunks = []
-        if results['documents']:
-            for i, doc in enumerate(results['documents'][0]):
-                relevant_chunks.append({
-                    'content': doc,
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else 0
-                })
+        by_id = self.vector_store.get([chunk_id for chunk_id, _ in hits])
         
-        return relevant_chunks
+        # Ids missing from the store were deleted after the index was built.
+        return [
+            {'id': chunk_id, 'content': by_id[chunk_id][0], 'metadata': by_id[chunk_id][1], 'distance': distance}
+            for chunk_id, distance in hits
+            if chunk_id in by_id
+        ]
     
-    def generate_response(self, query: str, context_chunks: List[Dict]) -> Tuple[str, List[str]]:
-        """Generate response using Ollama with retrieved context"""
-        
-        # Prepare context from retrieved chunks
-        context = "\n\n".join([
-            f"Source {i+1}: {chunk['content']}" 
-            for i, chunk in enumerate(context_chunks)
-        ])
-        
-        # Create prompt
-        prompt = f"""You are a helpful code documentation assistant. Use the following documentation context to answer the user's question. If the context doesn't contain enough information to answer the question, say so clearly.
-
-Context:
-{context}
-
-Question: {query}
-
-Answer: Provide a detailed and helpful answer based on the documentation context above. Include code examples when relevant."""
+    def generate_response(self, query: str, context_chunks: List[Dict],
+                          memory: ConversationMemory = None) -> Tuple[str, List[str], Dict]:
+        """Generate response using Ollama with retrieved context; also returns Ollama's timings"""
+        messages = build_messages(query, context_chunks, memory)
 
         try:
-            # Generate response using Ollama
-            response = self.ollama_client.generate(
-                model=settings.OLLAMA_MODEL,
-                prompt=prompt,
+            answer, stats = self.llm.chat(
+                messages,
                 options={
                     'temperature': 0.7,
                     'top_p': 0.9,
-                    'max_tokens': 1000
+                    'num_predict': 1000
                 }
             )
-            
-            answer = response['response']
             sources = [chunk['metadata'].get('document_id', 'unknown') for chunk in context_chunks]
             
-            return answer, sources
+            return answer, sources, stats.as_dict()
             
         except Exception as e:
-            return f"Error generating response: {str(e)}", []
+            return f"Error generating response: {str(e)}", [], {}
     
-    def chat(self, query: str) -> Dict:
+    def chat(self, query: str, memory: ConversationMemory = None) -> Dict:
         """Main chat function that combines retrieval and generation"""
+        # Follow-ups like "how do I configure it?" retrieve poorly on their
+        # own, so search with a standalone rewrite when there is history
+        retrieval_query = rewrite_query(self.llm, query, memory) if memory else query
+        
         # Retrieve relevant chunks
-        relevant_chunks = self.retrieve_relevant_chunks(query)
+        relevant_chunks = self.retrieve_relevant_chunks(retrieval_query)
         
         # Generate response
-        answer, sources = self.generate_response(query, relevant_chunks)
+        answer, sources, timings = self.generate_response(query, relevant_chunks, memory)
         
         return {
             'answer': answer,
             'sources': sources,
-            'relevant_chunks': relevant_chunks
+            'relevant_chunks': relevant_chunks,
+            'retrieval_query': retrieval_query,
+            'timings': timings
         }
\ No newline at end of file
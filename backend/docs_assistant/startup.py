@@ -0,0 +1,45 @@
+# docs_assistant/startup.py
+"""Work done once when a web server process starts (see backend/wsgi.py)."""
+import os
+
+from django.conf import settings
+
+from .background import get_background_queue
+from .health import get_health_monitor
+from .llm import warm_up_in_background
+from .services import get_embedding_model
+
+
+def load_embedding_model():
+    get_embedding_model()
+    # Readiness depends on the model; report it without waiting a full interval.
+    get_health_monitor().request_refresh()
+
+
+_started = False
+
+
+def on_server_start():
+    """Load models in the background"""
+    global _started
+    _started = True
+    # The health monitor is left to start on the first readiness probe: under
+    # `gunicorn --preload` this runs in the master, and the stores its checks
+    # open (Chroma keeps its own per-path client cache) must not be inherited
+    # by the workers.
+    get_background_queue().submit(load_embedding_model)
+    if settings.OLLAMA_WARMUP:
+        warm_up_in_background()
+
+
+def _restart_after_fork():
+    # Under `gunicorn --preload` wsgi.py (and so on_server_start) runs in the
+    # master only; redo it in each worker, whose threads died with the fork.
+    # Registered after the reset hooks of the modules imported above, so it
+    # runs after them.
+    if _started:
+        on_server_start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
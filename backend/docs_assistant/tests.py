@@ -1,3 +1,488 @@
-from django.test import TestCase
+import os
+import signal
+import sys
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import ollama
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import compression, html_extraction, llm, vector_store
+from .background import get_background_queue
+from .bench.fakes import FakeOllamaServer
+from .compression import CompressedIndex
+from .db import get_write_queue
+from .health import HealthMonitor
+from .html_extraction import LxmlExtractor, get_html_extractor
+from .llm import SYSTEM_PROMPT, LLMClient, LLMMetrics, LLMStats, build_messages, llm_metrics
+from .memory import (ConversationMemory, _truncate_to_tokens, estimate_tokens, load_memory, rewrite_query,
+                     schedule_summary_update, update_session_summary)
+from .deletion import purge_document, purge_document_and_vectors, purge_session
+from .models import ChatMessage, ChatSession, DocumentChunk, DocumentSource
+from .services import DocumentProcessor
+from .vector_store import MmapVectorStore
+
+
+def unit_vectors(count: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class MmapVectorStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = MmapVectorStore(directory=self.directory.name)
+        self.vectors = unit_vectors(4)
+
+    def add(self, ids, vectors, document_id='doc'):
+        self.store.add(ids, vectors, [f"text {chunk_id}" for chunk_id in ids],
+                       [{'document_id': document_id} for _ in ids])
+
+    def assertNearest(self, vector, chunk_id, **kwargs):
+        result = self.store.query(vector, top_k=1, **kwargs)[0]
+        self.assertEqual(result['id'], chunk_id)
+        self.assertAlmostEqual(result['distance'], 0.0, places=5)
+
+    def test_add_and_query(self):
+        self.add(['a', 'b'], self.vectors[:2])
+        self.add(['c'], self.vectors[2:3], document_id='other')
+
+        self.assertEqual(self.store.count(), 3)
+        for chunk_id, vector in zip('abc', self.vectors):
+            self.assertNearest(vector, chunk_id)
+        result = self.store.query(self.vectors[2], top_k=1)[0]
+        self.assertEqual(result['content'], 'text c')
+        self.assertEqual(result['metadata'], {'document_id': 'other'})
+        self.assertEqual({r['id'] for r in self.store.query(self.vectors[2], top_k=3, document_ids=['doc'])},
+                         {'a', 'b'})
+        self.assertEqual(self.store.query(self.vectors[0], document_ids=[]), [])
+
+    def test_add_replaces_existing_id(self):
+        self.add(['a'], self.vectors[:1])
+        self.add(['a'], self.vectors[1:2])
+
+        self.assertEqual(self.store.count(), 1)
+        self.assertNearest(self.vectors[1], 'a')
+
+    def test_delete(self):
+        self.add(['a', 'b'], self.vectors[:2])
+        self.add(['c'], self.vectors[2:3], document_id='other')
+
+        self.store.delete(ids=['a'])
+        self.assertEqual(set(self.store.get(['a', 'b', 'c'])), {'b', 'c'})
+        self.store.delete(document_id='other')
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual([r['id'] for r in self.store.query(self.vectors[2], top_k=5)], ['b'])
+
+    def test_compact(self):
+        self.add(['a', 'b', 'c'], self.vectors[:3])
+        self.store.delete(ids=['b'])
+        self.store.compact()
+
+        self.assertEqual(self.store.count(), 2)
+        self.assertNearest(self.vectors[0], 'a')
+        self.assertNearest(self.vectors[2], 'c')
+        ids, embeddings = self.store.all_embeddings()
+        self.assertEqual(ids, ['a', 'c'])
+        self.assertEqual(embeddings.shape, (2, 8))
+
+        self.add(['d'], self.vectors[3:4])
+        self.assertNearest(self.vectors[3], 'd')
+
+    def test_failed_add_leaves_no_stale_rows(self):
+        self.add(['a', 'b'], self.vectors[:2])
+        with self.assertRaises(TypeError):
+            self.store.add(['x'], self.vectors[2:3], ['x'], [{'document_id': 'doc', 'bad': object()}])
+        with self.assertRaises(ValueError):
+            self.store.add(['y'], unit_vectors(1, dimension=4), ['y'], [{}])
+        self.add(['c', 'd'], self.vectors[2:4])
+
+        self.assertEqual(self.store.count(), 4)
+        for chunk_id, vector in zip('abcd', self.vectors):
+            self.assertNearest(vector, chunk_id)
+
+        # Reopening maps the file from disk rather than the cached view.
+        reopened = MmapVectorStore(directory=self.directory.name)
+        self.assertEqual(reopened.query(self.vectors[2], top_k=1)[0]['id'], 'c')
+
+    def test_leftover_rows_from_uncommitted_add_are_overwritten(self):
+        self.add(['a'], self.vectors[:1])
+        # Simulate a crash between the vector write and the SQLite commit.
+        with open(self.store._vectors_path(0), 'ab') as file:
+            file.write(unit_vectors(3, seed=1).tobytes())
+        self.add(['b'], self.vectors[1:2])
+
+        self.assertNearest(self.vectors[1], 'b')
+        reopened = MmapVectorStore(directory=self.directory.name)
+        self.assertEqual(reopened.query(self.vectors[1], top_k=1)[0]['id'], 'b')
+
+
+class CompressedIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.vectors = unit_vectors(304, dimension=16)
+        CompressedIndex.build('pca', [f"r{i}" for i in range(300)], self.vectors[:300],
+                              directory=self.directory.name, components=8)
+
+    def assertConsistent(self, index, expected_ids):
+        self.assertEqual(len(index), len(expected_ids))
+        self.assertEqual(len(index.ids), len(index.codes))
+        self.assertEqual(len(index.ids), len(index._vectors))
+        for id_ in expected_ids:
+            row = int(id_[1:])
+            self.assertEqual(index.search(self.vectors[row], top_k=1, candidates=400)[0][0], id_)
+
+    def test_writers_with_separate_instances_keep_each_others_rows(self):
+        first = CompressedIndex.load(self.directory.name)
+        second = CompressedIndex.load(self.directory.name)
+
+        first.add(['r300'], self.vectors[300:301])
+        second.add(['r301'], self.vectors[301:302])
+        first.delete(['r0'])
+        second.add(['r302'], self.vectors[302:303])
+
+        expected = [f"r{i}" for i in range(1, 303)]
+        self.assertConsistent(second, expected)
+        self.assertConsistent(CompressedIndex.load(self.directory.name), expected)
+        with open(f"{self.directory.name}/vectors.f32", 'rb') as file:
+            self.assertEqual(len(file.read()), 303 * 16 * 4)
+
+    def test_add_overwrites_rows_of_a_failed_add(self):
+        index = CompressedIndex.load(self.directory.name)
+        # Vectors written, manifest never updated.
+        with open(f"{self.directory.name}/vectors.f32", 'ab') as file:
+            unit_vectors(2, dimension=16, seed=1).tofile(file)
+        index.add(['r300'], self.vectors[300:301])
+
+        self.assertConsistent(CompressedIndex.load(self.directory.name), [f"r{i}" for i in range(301)])
+
+    def test_missing_fcntl_only_fails_on_disk_indexes(self):
+        with mock.patch.dict(sys.modules, {'fcntl': None}):
+            in_memory = CompressedIndex.build('pca', ['a', 'b'], self.vectors[:2], components=2)
+            self.assertEqual(in_memory.search(self.vectors[0], top_k=1)[0][0], 'a')
+            with self.assertRaisesMessage(RuntimeError, 'fcntl'):
+                CompressedIndex.load(self.directory.name)
+
+
+# The write queue is on in production; writes inside the test transaction
+# must still run inline rather than wait on the writer thread.
+@override_settings(DATABASE_WRITE_QUEUE=True)
+class DeletionTests(TestCase):
+    def test_purge_session(self):
+        session = ChatSession.objects.create()
+        ChatMessage.objects.create(session=session, message_type='user', content='hello')
+
+        self.assertTrue(purge_session(session.id))
+        self.assertFalse(ChatSession.objects.exists())
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertFalse(purge_session(session.id))
+
+    def test_purge_document(self):
+        document = DocumentSource.objects.create(title='doc', source_type='text')
+        document.text_content = 'text'
+        document.save()
+        DocumentChunk.objects.bulk_create(
+            DocumentChunk(document=document, content=f"chunk {i}", chunk_index=i) for i in range(5)
+        )
+
+        self.assertEqual(purge_document(document.id, batch_size=2), 5)
+        self.assertFalse(DocumentSource.objects.exists())
+        self.assertFalse(DocumentChunk.objects.exists())
+
+    @override_settings(DOCUMENT_DELETE_SYNC_MAX_CHUNKS=3, ALLOWED_HOSTS=['testserver'])
+    def test_large_document_delete_defers_vectors(self):
+        document = DocumentSource.objects.create(title='doc', source_type='text')
+        DocumentChunk.objects.bulk_create(
+            DocumentChunk(document=document, content=f"chunk {i}", chunk_index=i) for i in range(5)
+        )
+        queue = mock.Mock()
+        with mock.patch('docs_assistant.views.get_background_queue', return_value=queue), \
+                mock.patch('docs_assistant.views.delete_document_vectors') as view_vectors:
+            response = self.client.delete(f"/api/documents/{document.id}/")
+
+        self.assertEqual(response.status_code, 202)
+        view_vectors.assert_not_called()
+        queue.submit.assert_called_once_with(purge_document_and_vectors, document.id, 5)
+        self.assertEqual(DocumentSource.objects.get().processing_status, 'deleting')
+
+        with mock.patch('docs_assistant.deletion.delete_document_vectors') as vectors:
+            purge_document_and_vectors(document.id, 5)
+        vectors.assert_called_once_with(document.id, 5)
+        self.assertFalse(DocumentSource.objects.exists())
+
+
+class MemoryTests(TestCase):
+    def setUp(self):
+        self.session = ChatSession.objects.create()
+
+    def add_messages(self, count: int):
+        for i in range(count):
+            ChatMessage.objects.create(session=self.session, message_type='user' if i % 2 == 0 else 'assistant',
+                                       content=f"message {i} " + "word " * 8)
+        return list(self.session.messages.order_by('id').values_list('id', 'message_type', 'content'))
+
+    def test_load_memory_keeps_newest_turns_within_budget(self):
+        messages = self.add_messages(4)
+        cost = estimate_tokens(messages[-1][2])
+
+        memory = load_memory(self.session, budget=2 * cost + 1)
+        self.assertEqual(memory.turns, [(role, content) for _, role, content in messages[2:]])
+
+        # The newest message alone is over budget: keep a truncated copy.
+        _, role, content = messages[-1]
+        memory = load_memory(self.session, budget=cost // 2)
+        self.assertEqual(memory.turns, [(role, _truncate_to_tokens(content, cost // 2))])
+        self.assertTrue(memory.turns[0][1].endswith(' ...'))
+
+        self.session.summary = 'Earlier: setup.'
+        self.session.summarized_through = messages[2][0]
+        memory = load_memory(self.session, budget=10 * cost)
+        self.assertEqual(memory.summary, 'Earlier: setup.')
+        self.assertEqual(memory.turns, [messages[3][1:]])
+
+    def test_update_session_summary(self):
+        messages = self.add_messages(settings.CHAT_HISTORY_MESSAGES + 2)
+        client = mock.Mock()
+        client.generate.return_value = ('Installed it.', None)
+
+        update_session_summary(self.session.id, client=client)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, 'Installed it.')
+        self.assertEqual(self.session.summarized_through, messages[1][0])
+        self.assertIn(messages[1][2], client.generate.call_args[0][0])
+
+    def test_update_session_summary_does_not_overwrite_a_newer_one(self):
+        messages = self.add_messages(settings.CHAT_HISTORY_MESSAGES + 2)
+
+        def concurrent_update(prompt, options):
+            ChatSession.objects.filter(id=self.session.id).update(
+                summary='Newer summary.', summarized_through=messages[1][0])
+            return 'Stale summary.', None
+
+        update_session_summary(self.session.id, client=mock.Mock(generate=concurrent_update))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, 'Newer summary.')
+
+    def test_rewrite_query(self):
+        memory = ConversationMemory(turns=[('user', 'How do I install it?'), ('assistant', 'Use pip.')])
+        client = mock.Mock()
+        client.generate.return_value = ('"How to upgrade the package"\nextra', None)
+        self.assertEqual(rewrite_query(client, 'And upgrade?', memory), 'How to upgrade the package')
+
+        client.generate.side_effect = ConnectionError
+        with self.assertLogs('docs_assistant.memory', 'WARNING'):
+            self.assertEqual(rewrite_query(client, 'And upgrade?', memory), 'How do I install it? And upgrade?')
+
+        client.reset_mock()
+        self.assertEqual(rewrite_query(client, 'And upgrade?', ConversationMemory()), 'And upgrade?')
+        client.generate.assert_not_called()
+
+    def test_schedule_summary_update_waits_for_a_full_batch(self):
+        threshold = settings.CHAT_HISTORY_MESSAGES + settings.CHAT_SUMMARY_BATCH_MESSAGES
+        self.add_messages(threshold - 1)
+        queue = mock.Mock()
+        with mock.patch('docs_assistant.memory.get_background_queue', return_value=queue):
+            schedule_summary_update(self.session)
+            queue.submit.assert_not_called()
+
+            self.add_messages(1)
+            schedule_summary_update(self.session)
+        queue.submit.assert_called_once_with(update_session_summary, self.session.id)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class HealthTests(TestCase):
+    def setUp(self):
+        self.vector_store = mock.Mock()
+        self.vector_store.count.return_value = 3
+        ollama_client = mock.Mock()
+        ollama_client.list.side_effect = ConnectionError('Ollama is down')
+        self.monitor = HealthMonitor(ttl=60, embedding_model=mock.Mock(), vector_store=self.vector_store,
+                                     ollama_client=ollama_client)
+        # Refreshed by hand rather than by the monitor's thread.
+        patches = [mock.patch.object(self.monitor, 'start'),
+                   mock.patch('docs_assistant.views.get_health_monitor', return_value=self.monitor)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_not_ready_before_first_refresh(self):
+        response = self.client.get(reverse('readiness_check'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'starting')
+        self.assertEqual(self.client.get(reverse('health_check')).json()['status'], 'unhealthy')
+
+    def test_optional_check_failing_keeps_ready(self):
+        self.monitor.refresh()
+
+        response = self.client.get(reverse('readiness_check'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['checks']['ollama']['ok'])
+        health = self.client.get(reverse('health_check')).json()
+        self.assertEqual((health['status'], health['ollama_status']), ('healthy', 'disconnected'))
+
+    def test_required_check_failing_is_not_ready(self):
+        self.vector_store.count.side_effect = OSError('disk gone')
+        self.monitor.refresh()
+
+        self.assertEqual(self.client.get(reverse('readiness_check')).status_code, 503)
+
+    def test_stale_snapshot_is_not_ready(self):
+        self.monitor.refresh()
+        self.monitor._snapshot['checked_at'] -= 61
+
+        response = self.client.get(reverse('readiness_check'))
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.json()['stale'])
+        self.assertEqual(self.client.get(reverse('health_check')).json()['status'], 'unhealthy')
+
+
+class ForkTests(SimpleTestCase):
+    def run_in_child(self, child) -> bytes:
+        """Output `child(write)` sends through the pipe from a forked child"""
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if not pid:
+            status = 1
+            signal.alarm(10)  # a dead queue or a held lock would block forever
+            try:
+                child(lambda data: os.write(write_end, data))
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(write_end)
+        _, status = os.waitpid(pid, 0)
+        with os.fdopen(read_end, 'rb') as pipe:
+            output = pipe.read()
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        return output
+
+    def test_queues_work_in_forked_child(self):
+        # What a gunicorn --preload worker sees: queues created in the master.
+        get_background_queue().submit(lambda: None)
+        get_write_queue()
+
+        def child(write):
+            queue = get_background_queue()
+            queue.submit(write, b'background ')
+            queue.join()
+            if get_write_queue()._thread.is_alive():
+                write(b'writes')
+
+        self.assertEqual(self.run_in_child(child), b'background writes')
+
+    def test_singleton_locks_held_at_fork_are_free_in_child(self):
+        modules = [compression, html_extraction, llm, vector_store]
+        names = ['_loaded_lock', '_extractors_lock', '_client_lock', '_default_stores_lock']
+        locks = [getattr(module, name) for module, name in zip(modules, names)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            def child(write):
+                for module, name in zip(modules, names):
+                    lock = getattr(module, name)
+                    if lock.acquire(blocking=False):
+                        lock.release()
+                        write(b'.')
+                get_html_extractor('lxml')
+
+            self.assertEqual(self.run_in_child(child), b'....')
+        finally:
+            for lock in locks:
+                lock.release()
+
+
+class HTMLExtractionTests(SimpleTestCase):
+    PAGE = (b'<html><head><meta charset="%s"><title>Guide</title></head><body><nav>Menu</nav>'
+            b'<main><h1>Caf\xc3\xa9</h1><p>Install it.</p><h2>Usage</h2><p>Run it.</p></main></body></html>')
+
+    def test_sections(self):
+        page = LxmlExtractor().extract(self.PAGE % b'utf-8')
+        self.assertEqual(page.title, 'Guide')
+        self.assertEqual(page.text, 'Caf\u00e9\nInstall it.\nUsage\nRun it.')
+        self.assertEqual(page.section_at(page.text.index('Run')), 'Caf\u00e9 > Usage')
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        extractor = LxmlExtractor()
+        self.assertIn('Install it.', extractor.extract(self.PAGE % b'utf-9x').text)
+        self.assertIn('Caf\u00e9', extractor.extract(self.PAGE % b'utf-8', encoding='no-such-charset').text)
+
+    def test_page_without_text_is_an_error(self):
+        processor = DocumentProcessor(embedding_model=mock.Mock(), vector_store=mock.Mock(),
+                                      compressed_index=mock.Mock(), html_extractor=LxmlExtractor(),
+                                      document_index=mock.Mock())
+        with mock.patch('docs_assistant.services.fetch_html', return_value=(b'<html><body></body></html>', None)):
+            with self.assertRaises(ValueError):
+                processor.extract_url('https://example.com/')
+
+
+class LLMTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeOllamaServer(load_time=0.05).start()
+        self.addCleanup(self.server.stop)
+        llm_metrics.reset()
+        self.addCleanup(llm_metrics.reset)
+
+    def llm_client(self, **kwargs) -> LLMClient:
+        return LLMClient(client=ollama.Client(host=self.server.url), model='llama2', **kwargs)
+
+    @override_settings(OLLAMA_KEEP_ALIVE='-1')
+    def test_keep_alive_is_sent(self):
+        self.llm_client().generate('hello')
+        self.llm_client(keep_alive='30m').chat([{'role': 'user', 'content': 'hello'}])
+        self.llm_client(keep_alive=600).generate('hello')
+
+        self.assertEqual([(path, body['keep_alive']) for path, body in self.server.received],
+                         [('/api/generate', -1), ('/api/chat', '30m'), ('/api/generate', 600)])
+
+    def test_warm_up_only_loads_the_model(self):
+        stats = self.llm_client().warm_up()
+
+        path, body = self.server.received[-1]
+        self.assertEqual((path, body['prompt']), ('/api/generate', ''))
+        self.assertEqual(stats.generated_tokens, 0)
+        self.assertGreater(stats.load_seconds, 0.04)
+        self.assertLess(self.llm_client().generate('hello')[1].load_seconds, 0.04)
+
+    def test_stats_are_seconds_and_aggregated(self):
+        stats = LLMStats({'load_duration': 2_000_000_000, 'prompt_eval_count': 7,
+                          'prompt_eval_duration': 500_000_000, 'eval_count': 3,
+                          'eval_duration': 1_500_000_000, 'total_duration': 4_000_000_000})
+        self.assertEqual(stats.as_dict(), {
+            'load_seconds': 2.0, 'prompt_tokens': 7, 'prompt_eval_seconds': 0.5,
+            'generated_tokens': 3, 'generation_seconds': 1.5, 'total_seconds': 4.0,
+        })
+
+        metrics = LLMMetrics()
+        metrics.record(stats)
+        metrics.record(LLMStats({'load_duration': 0, 'prompt_eval_count': 1}))
+        summary = metrics.summary()
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['mean']['load_seconds'], 1.0)
+        self.assertEqual(summary['mean']['prompt_tokens'], 4.0)
+        self.assertEqual(summary['max']['total_seconds'], 4.0)
+
+        client = self.llm_client()
+        client.warm_up()
+        client.generate('hello')
+        self.assertEqual(llm_metrics.summary()['requests'], 2)
+        self.assertGreater(llm_metrics.summary()['max']['load_seconds'], 0.04)
+
+    def test_build_messages_puts_stable_parts_first(self):
+        memory = ConversationMemory('Talked about setup.', [('user', 'How to install?'), ('assistant', 'Use pip.')])
+        messages = build_messages('And upgrade?', [{'content': 'pip install -U'}], memory)
+
+        self.assertEqual([message['role'] for message in messages],
+                         ['system', 'system', 'user', 'assistant', 'user'])
+        self.assertEqual(messages[0]['content'], SYSTEM_PROMPT)
+        self.assertIn('Talked about setup.', messages[1]['content'])
+        self.assertEqual([message['content'] for message in messages[2:4]], ['How to install?', 'Use pip.'])
+        self.assertEqual(messages[-1]['content'],
+                         "Documentation context:\nSource 1: pip install -U\n\nQuestion: And upgrade?")
+        self.assertEqual(len(build_messages('q', [])), 2)
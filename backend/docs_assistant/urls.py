@@ -11,5 +11,7 @@ urlpatterns = [
     path('chat/sessions/<uuid:session_id>/messages/', views.get_chat_messages, name='get_chat_messages'),
     path('chat/sessions/<uuid:session_id>/', views.delete_chat_session, name='delete_chat_session'),
     path('health/', views.health_check, name='health_check'),
+    path('health/live/', views.liveness_check, name='liveness_check'),
+    path('health/ready/', views.readiness_check, name='readiness_check'),
 ]
 
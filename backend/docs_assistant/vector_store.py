@@ -0,0 +1,394 @@
+# docs_assistant/vector_store.py
+"""Pluggable vector storage for document chunks and per-document centroids."""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+
+class VectorStore:
+    """Interface shared by the vector store backends"""
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        raise NotImplementedError
+
+    def query(self, embedding: np.ndarray, top_k: int = 5,
+              document_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Closest {'id', 'content', 'metadata', 'distance'} dicts, restricted to `document_ids` if given"""
+        raise NotImplementedError
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, Dict]]:
+        """Map each stored id to its (document, metadata)"""
+        raise NotImplementedError
+
+    def delete(self, ids: Optional[List[str]] = None, document_id: Optional[str] = None):
+        """Delete the given ids and/or every chunk of `document_id`"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def all_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        raise NotImplementedError
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, collection=None, path: Optional[str] = None, name: Optional[str] = None):
+        if collection is None:
+            import chromadb
+            client = chromadb.PersistentClient(path=path or settings.CHROMA_PERSIST_DIRECTORY)
+            collection = client.get_or_create_collection(f"documentation_{name}" if name else "documentation")
+        self.collection = collection
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, embedding, top_k=5, document_ids=None):
+        where = {'document_id': {'$in': list(document_ids)}} if document_ids is not None else None
+        if where is not None and not document_ids:
+            return []
+        results = self.collection.query(query_embeddings=np.asarray(embedding)[None, :], n_results=top_k, where=where)
+        if not results['ids'] or not results['ids'][0]:
+            return []
+        distances = results.get('distances') or [[0] * len(results['ids'][0])]
+        return [
+            {
+                'id': chunk_id,
+                'content': results['documents'][0][i],
+                'metadata': results['metadatas'][0][i],
+                'distance': distances[0][i],
+            }
+            for i, chunk_id in enumerate(results['ids'][0])
+        ]
+
+    def get(self, ids):
+        results = self.collection.get(ids=ids, include=['documents', 'metadatas'])
+        return {
+            chunk_id: (results['documents'][i], results['metadatas'][i])
+            for i, chunk_id in enumerate(results['ids'])
+        }
+
+    def delete(self, ids=None, document_id=None):
+        if ids:
+            self.collection.delete(ids=ids)
+        if document_id is not None:
+            self.collection.delete(where={'document_id': document_id})
+
+    def count(self):
+        return self.collection.count()
+
+    def all_embeddings(self, batch_size: int = 5000):
+        ids, batches = [], []
+        offset = 0
+        while True:
+            page = self.collection.get(include=['embeddings'], limit=batch_size, offset=offset)
+            if not page['ids']:
+                break
+            ids.extend(page['ids'])
+            batches.append(np.asarray(page['embeddings'], dtype=np.float32))
+            offset += len(page['ids'])
+        if not batches:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return ids, np.concatenate(batches)
+
+
+class MmapVectorStore(VectorStore):
+    """Append-only float32 vectors in a memory-mapped file plus a SQLite sidecar.
+
+    Vectors are normalized on insert and searched by exact inner product, so
+    `distance` is the cosine distance. Loading is zero-copy: the vector file is
+    mapped, not read, and every worker process mapping it shares the same page
+    cache. Readers take no locks; they only remap when SQLite reports that
+    another connection committed (``PRAGMA data_version``).
+
+    Layout of `directory`:
+        records.sqlite3      ids, text, metadata and tombstones, keyed by row
+        vectors-<gen>.f32    row-major vectors; a new generation is written by
+                             compact(), so old mappings stay valid until dropped
+    """
+
+    def __init__(self, directory: Optional[str] = None, name: Optional[str] = None):
+        self.directory = directory or settings.VECTOR_STORE_DIRECTORY
+        if name:
+            self.directory = os.path.join(self.directory, name)
+        os.makedirs(self.directory, exist_ok=True)
+        self._local = threading.local()
+        self._view_lock = threading.Lock()
+        self._view = None
+        self._view_version = None
+
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS records (
+                    row INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    document_id TEXT,
+                    document TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS records_id ON records (id) WHERE deleted = 0;
+                CREATE INDEX IF NOT EXISTS records_document ON records (document_id) WHERE deleted = 0;
+                INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0'), ('rows', '0'), ('dimension', '0');
+            """)
+        # Only ever used under _view_lock to read PRAGMA data_version, which
+        # changes whenever any *other* connection commits. Writes go through
+        # the per-thread connections, so every write is observed here.
+        self._watcher = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(os.path.join(self.directory, 'records.sqlite3'),
+                                     timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return connection
+
+    def _meta(self, connection) -> Dict[str, int]:
+        return {key: int(value) for key, value in connection.execute('SELECT key, value FROM meta')}
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors-{generation}.f32")
+
+    def _snapshot(self):
+        """Current (vectors, live-row mask), remapped only after another commit"""
+        with self._view_lock:
+            connection = self._watcher
+            version = connection.execute('PRAGMA data_version').fetchone()[0]
+            if self._view is not None and self._view_version == version:
+                return self._view
+
+            # One read transaction, so meta and tombstones come from the same
+            # WAL snapshot.
+            connection.execute('BEGIN')
+            try:
+                meta = self._meta(connection)
+                live_rows = [row for (row,) in connection.execute('SELECT row FROM records WHERE deleted = 0')]
+            finally:
+                connection.commit()
+
+            rows, dimension = meta['rows'], meta['dimension']
+            if rows and dimension:
+                vectors = np.memmap(self._vectors_path(meta['generation']), dtype=np.float32,
+                                    mode='r', shape=(rows, dimension))
+                live = np.zeros(rows, dtype=bool)
+                live[live_rows] = True
+            else:
+                vectors, live = np.empty((0, max(dimension, 1)), dtype=np.float32), np.zeros(0, dtype=bool)
+
+            self._view, self._view_version = (vectors, live), version
+            return self._view
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        # Serialize first: a metadata value json can't encode must fail the
+        # add before anything touches the vector file.
+        records = [
+            (chunk_id, (metadatas[i] or {}).get('document_id'), documents[i], json.dumps(metadatas[i] or {}))
+            for i, chunk_id in enumerate(ids)
+        ]
+
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            meta = self._meta(connection)
+            dimension = meta['dimension'] or vectors.shape[1]
+            if vectors.shape[1] != dimension:
+                raise ValueError(f"Expected {dimension}-dimensional embeddings, got {vectors.shape[1]}")
+
+            # Rows past meta['rows'] are leftovers of an uncommitted add and
+            # are overwritten. Not append mode: that would ignore the seek.
+            start = meta['rows']
+            path = self._vectors_path(meta['generation'])
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as file:
+                file.seek(start * dimension * 4)
+                file.write(vectors.tobytes())
+                file.truncate((start + len(ids)) * dimension * 4)
+
+            connection.executemany(
+                'UPDATE records SET deleted = 1 WHERE id = ? AND deleted = 0', [(chunk_id,) for chunk_id in ids]
+            )
+            connection.executemany(
+                'INSERT INTO records (row, id, document_id, document, metadata) VALUES (?, ?, ?, ?, ?)',
+                [(start + i, *record) for i, record in enumerate(records)],
+            )
+            connection.executemany('UPDATE meta SET value = ? WHERE key = ?', [
+                (str(start + len(ids)), 'rows'), (str(dimension), 'dimension'),
+            ])
+
+    def _document_rows(self, document_ids: List[str], limit: int) -> np.ndarray:
+        placeholders = ','.join('?' * len(document_ids))
+        rows = np.fromiter(
+            (row for (row,) in self._connection().execute(
+                f'SELECT row FROM records WHERE deleted = 0 AND document_id IN ({placeholders})',
+                list(document_ids),
+            )),
+            dtype=np.int64,
+        )
+        # Rows committed after the snapshot was taken are not mapped yet.
+        return rows[rows < limit]
+
+    def query(self, embedding, top_k=5, document_ids=None):
+        vectors, live = self._snapshot()
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        if document_ids is None:
+            rows = np.flatnonzero(live)
+            scores = (vectors @ query)[rows] if len(rows) else np.empty(0, dtype=np.float32)
+        else:
+            # Only the selected documents' rows are read from the mapping.
+            rows = self._document_rows(document_ids, len(live)) if document_ids else np.empty(0, dtype=np.int64)
+            scores = vectors[rows] @ query
+        if not len(rows):
+            return []
+
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        rows, scores = rows[best], scores[best]
+
+        placeholders = ','.join('?' * len(rows))
+        records = {
+            row: (chunk_id, document, metadata)
+            for row, chunk_id, document, metadata in self._connection().execute(
+                f'SELECT row, id, document, metadata FROM records WHERE row IN ({placeholders})',
+                [int(row) for row in rows],
+            )
+        }
+        return [
+            {
+                'id': records[row][0],
+                'content': records[row][1],
+                'metadata': json.loads(records[row][2]),
+                'distance': float(1.0 - score),
+            }
+            for row, score in zip(rows.tolist(), scores.tolist()) if row in records
+        ]
+
+    def get(self, ids):
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        return {
+            chunk_id: (document, json.loads(metadata))
+            for chunk_id, document, metadata in self._connection().execute(
+                f'SELECT id, document, metadata FROM records WHERE deleted = 0 AND id IN ({placeholders})', ids
+            )
+        }
+
+    def delete(self, ids=None, document_id=None):
+        connection = self._connection()
+        with connection:
+            if ids:
+                connection.executemany(
+                    'UPDATE records SET deleted = 1 WHERE id = ? AND deleted = 0', [(chunk_id,) for chunk_id in ids]
+                )
+            if document_id is not None:
+                connection.execute(
+                    'UPDATE records SET deleted = 1 WHERE document_id = ? AND deleted = 0', (document_id,)
+                )
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM records WHERE deleted = 0').fetchone()[0]
+
+    def all_embeddings(self):
+        vectors, live = self._snapshot()
+        rows = np.flatnonzero(live)
+        ids = dict(self._connection().execute('SELECT row, id FROM records WHERE deleted = 0'))
+        return [ids[row] for row in rows.tolist()], np.asarray(vectors[rows])
+
+    def compact(self):
+        """Rewrite the vector file without tombstoned rows into a new generation.
+
+        Rows are renumbered, so run it while ingestion is quiet: a query that
+        raced the compaction may resolve one stale row until its next remap.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            meta = self._meta(connection)
+            live_rows = [row for (row,) in connection.execute('SELECT row FROM records WHERE deleted = 0 ORDER BY row')]
+            generation = meta['generation'] + 1
+            if meta['rows'] and meta['dimension']:
+                vectors = np.memmap(self._vectors_path(meta['generation']), dtype=np.float32,
+                                    mode='r', shape=(meta['rows'], meta['dimension']))
+                vectors[live_rows].tofile(self._vectors_path(generation))
+            else:
+                open(self._vectors_path(generation), 'wb').close()
+
+            connection.execute('DELETE FROM records WHERE deleted = 1')
+            # Shift rows down in order; row is the primary key so go via negatives.
+            connection.executemany('UPDATE records SET row = ? WHERE row = ?',
+                                   [(-(new + 1), old) for new, old in enumerate(live_rows)])
+            connection.execute('UPDATE records SET row = -row - 1')
+            connection.executemany('UPDATE meta SET value = ? WHERE key = ?', [
+                (str(len(live_rows)), 'rows'), (str(generation), 'generation'),
+            ])
+
+        # Processes still mapping the previous generation keep their pages
+        # until they remap; unlinking only drops the directory entry.
+        for name in os.listdir(self.directory):
+            if name.startswith('vectors-') and name != os.path.basename(self._vectors_path(generation)):
+                os.remove(os.path.join(self.directory, name))
+
+
+VECTOR_STORE_BACKENDS = {
+    'chroma': ChromaVectorStore,
+    'mmap': MmapVectorStore,
+}
+
+# Store names: None is the chunk store, 'documents' the document index.
+DOCUMENT_INDEX = 'documents'
+
+_default_stores = {}
+_default_stores_lock = threading.Lock()
+
+
+def _default_store(name: Optional[str]) -> VectorStore:
+    with _default_stores_lock:
+        if name not in _default_stores:
+            try:
+                backend = VECTOR_STORE_BACKENDS[settings.VECTOR_STORE_BACKEND]
+            except KeyError:
+                raise ValueError(f"Unknown vector store backend: {settings.VECTOR_STORE_BACKEND}")
+            _default_stores[name] = backend(name=name)
+        return _default_stores[name]
+
+
+def _reset_after_fork():
+    # A lock held by another thread at fork() stays held in the child; see
+    # background._reset_after_fork.
+    global _default_stores, _default_stores_lock
+    _default_stores = {}
+    _default_stores_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_vector_store() -> VectorStore:
+    """Process-wide chunk store for `settings.VECTOR_STORE_BACKEND`"""
+    return _default_store(None)
+
+
+def get_document_index() -> VectorStore:
+    """Process-wide store of per-document centroid embeddings"""
+    return _default_store(DOCUMENT_INDEX)
@@ -2,12 +2,31 @@ from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
+from django.conf import settings
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
+from .background import get_background_queue
+from .db import run_write
+from .deletion import (
+    DELETING, delete_document_vectors, purge_document, purge_document_and_vectors, purge_session,
+    tombstone_document,
+)
+from .health import get_health_monitor
+from .llm import llm_metrics
+from .memory import load_memory, schedule_summary_update
 from .models import DocumentSource, ChatSession, ChatMessage, DocumentChunk
 from .services import DocumentProcessor, RAGService
 from .serializers import DocumentSourceSerializer, ChatSessionSerializer, ChatMessageSerializer
 import os
 
+def save_chunks(document, chunks, metadata, chunk_metadata=None):
+    """Insert a document's chunk rows in one batched write"""
+    run_write(DocumentChunk.objects.bulk_create, [
+        DocumentChunk(document=document, content=content, chunk_index=i,
+                      metadata={**metadata, **(chunk_metadata[i] if chunk_metadata else {})})
+        for i, content in enumerate(chunks)
+    ], batch_size=500)
+
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser, JSONParser])
 def upload_document(request):
@@ -16,7 +35,8 @@ def upload_document(request):
         source_type = request.data.get('source_type')
         title = request.data.get('title', 'Untitled Document')
         
-        document = DocumentSource.objects.create(
+        document = run_write(
+            DocumentSource.objects.create,
             title=title,
             source_type=source_type
         )
@@ -29,28 +49,25 @@ def upload_document(request):
                 return Response({'error': 'URL is required'}, status=status.HTTP_400_BAD_REQUEST)
             
             document.url = url
-            document.save()
+            run_write(document.save)
             
             # Process URL
             try:
-                text_content = processor.process_url(url)
-                document.text_content = text_content
-                chunks = processor.chunk_text(text_content)
+                page = processor.extract_url(url)
+                document.text_content = page.text
+                chunks = processor.chunk_text(page.text)
+                # Heading path of each chunk, e.g. "Install > Configuration"
+                sections = [{'section': section} if section else {} for section in page.chunk_sections(chunks)]
                 
                 # Store chunks in database
-                for i, chunk_content in enumerate(chunks):
-                    DocumentChunk.objects.create(
-                        document=document,
-                        content=chunk_content,
-                        chunk_index=i,
-                        metadata={'source_url': url}
-                    )
+                save_chunks(document, chunks, {'source_url': url}, sections)
                 
                 # Store in vector database
                 processor.store_chunks(
                     str(document.id), 
                     chunks, 
-                    {'title': title, 'source_type': 'url', 'url': url}
+                    {'title': title, 'source_type': 'url', 'url': url},
+                    sections
                 )
                 
                 document.processed = True
@@ -66,7 +83,7 @@ def upload_document(request):
                 return Response({'error': 'File is required'}, status=status.HTTP_400_BAD_REQUEST)
             
             document.file = file
-            document.save()
+            run_write(document.save)
             
             # Process file
             try:
@@ -76,13 +93,7 @@ def upload_document(request):
                 chunks = processor.chunk_text(text_content)
                 
                 # Store chunks in database
-                for i, chunk_content in enumerate(chunks):
-                    DocumentChunk.objects.create(
-                        document=document,
-                        content=chunk_content,
-                        chunk_index=i,
-                        metadata={'filename': file.name}
-                    )
+                save_chunks(document, chunks, {'filename': file.name})
                 
                 # Store in vector database
                 processor.store_chunks(
@@ -109,13 +120,7 @@ def upload_document(request):
                 chunks = processor.chunk_text(text_content)
                 
                 # Store chunks in database
-                for i, chunk_content in enumerate(chunks):
-                    DocumentChunk.objects.create(
-                        document=document,
-                        content=chunk_content,
-                        chunk_index=i,
-                        metadata={'source_type': 'text'}
-                    )
+                save_chunks(document, chunks, {'source_type': 'text'})
                 
                 # Store in vector database
                 processor.store_chunks(
@@ -131,7 +136,7 @@ def upload_document(request):
                 document.processing_status = 'failed'
                 document.error_message = str(e)
         
-        document.save()
+        run_write(document.save)
         serializer = DocumentSourceSerializer(document)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -141,7 +146,11 @@ def upload_document(request):
 @api_view(['GET'])
 def list_documents(request):
     """List all uploaded documents"""
-    documents = DocumentSource.objects.all().order_by('-created_at')
+    documents = (
+        DocumentSource.objects.exclude(processing_status=DELETING)
+        .annotate(chunks_total=Count('chunks'))
+        .order_by('-created_at')
+    )
     serializer = DocumentSourceSerializer(documents, many=True)
     return Response(serializer.data)
 
@@ -149,19 +158,29 @@ def list_documents(request):
 def delete_document(request, document_id):
     """Delete a document and its chunks"""
     try:
-        document = get_object_or_404(DocumentSource, id=document_id)
+        # Tombstone first so listings hide it while the purge runs
+        if not tombstone_document(document_id):
+            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        chunk_count = DocumentChunk.objects.filter(document_id=document_id).count()
+        
+        # Large documents are purged in the background, vectors included; the
+        # tombstone keeps them out of listings and lets
+        # `purge_deleted_documents` resume.
+        if chunk_count > settings.DOCUMENT_DELETE_SYNC_MAX_CHUNKS:
+            get_background_queue().submit(purge_document_and_vectors, document_id, chunk_count)
+            return Response(
+                {'message': 'Document deletion scheduled', 'status': DELETING},
+                status=status.HTTP_202_ACCEPTED
+            )
         
         # Delete from vector database
-        processor = DocumentProcessor()
         try:
-            # Get all chunk IDs for this document
-            chunk_ids = [f"{document_id}_{chunk.chunk_index}" for chunk in document.chunks.all()]
-            if chunk_ids:
-                processor.collection.delete(ids=chunk_ids)
-        except:
+            delete_document_vectors(document_id, chunk_count)
+        except Exception:
             pass  # Continue even if vector deletion fails
         
-        document.delete()
+        purge_document(document_id)
         return Response({'message': 'Document deleted successfully'})
         
     except Exception as e:
@@ -181,10 +200,14 @@ def chat(request):
         if session_id:
             session = get_object_or_404(ChatSession, id=session_id)
         else:
-            session = ChatSession.objects.create(title=query[:50] + '...' if len(query) > 50 else query)
+            session = run_write(ChatSession.objects.create, title=query[:50] + '...' if len(query) > 50 else query)
+        
+        # Summary and recent turns, loaded before this message is stored
+        memory = load_memory(session)
         
         # Save user message
-        user_message = ChatMessage.objects.create(
+        user_message = run_write(
+            ChatMessage.objects.create,
             session=session,
             message_type='user',
             content=query
@@ -192,21 +215,24 @@ def chat(request):
         
         # Generate response using RAG
         rag_service = RAGService()
-        result = rag_service.chat(query)
+        result = rag_service.chat(query, memory=memory)
         
         # Save assistant message
-        assistant_message = ChatMessage.objects.create(
+        assistant_message = run_write(
+            ChatMessage.objects.create,
             session=session,
             message_type='assistant',
             content=result['answer'],
             sources_used=result['sources']
         )
+        schedule_summary_update(session)
         
         return Response({
             'session_id': str(session.id),
             'answer': result['answer'],
             'sources': result['sources'],
-            'relevant_chunks': result['relevant_chunks']
+            'relevant_chunks': result['relevant_chunks'],
+            'timings': result['timings']
         })
         
     except Exception as e:
@@ -230,27 +256,31 @@ def get_chat_messages(request, session_id):
 @api_view(['DELETE'])
 def delete_chat_session(request, session_id):
     """Delete a chat session"""
-    session = get_object_or_404(ChatSession, id=session_id)
-    session.delete()
+    if not purge_session(session_id):
+        return Response({'error': 'Chat session not found'}, status=status.HTTP_404_NOT_FOUND)
     return Response({'message': 'Chat session deleted successfully'})
 
+@api_view(['GET'])
+def liveness_check(request):
+    """Liveness probe: the process is serving requests; touches nothing else"""
+    return Response({'status': 'alive'})
+
+@api_view(['GET'])
+def readiness_check(request):
+    """Readiness probe: answered from the background health snapshot"""
+    snapshot = get_health_monitor().snapshot()
+    return Response(snapshot, status=status.HTTP_200_OK if snapshot['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
 @api_view(['GET'])
 def health_check(request):
-    """Health check endpoint"""
-    try:
-        # Check Ollama connection
-        rag_service = RAGService()
-        ollama_status = "connected"
-        try:
-            rag_service.ollama_client.list()
-        except:
-            ollama_status = "disconnected"
-        
-        return Response({
-            'status': 'healthy',
-            'ollama_status': ollama_status,
-            'documents_count': DocumentSource.objects.count(),
-            'chat_sessions_count': ChatSession.objects.count()
-        })
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+    """Health status page, from the same snapshot plus Ollama timing totals"""
+    snapshot = get_health_monitor().snapshot()
+    checks = snapshot['checks']
+    return Response({
+        **snapshot,
+        'status': 'healthy' if snapshot['ready'] else 'unhealthy',
+        'ollama_status': 'connected' if checks.get('ollama', {}).get('ok') else 'disconnected',
+        'documents_count': checks.get('database', {}).get('documents_count'),
+        'chat_sessions_count': checks.get('database', {}).get('chat_sessions_count'),
+        'llm': llm_metrics.summary(),
+    })